@@ -0,0 +1,281 @@
+"""
+Benchmarks the retrieval and answer generation hot paths offline.
+
+Stub embedding/cross-encoder models and a stub LLM are used by default so the suite runs
+without network access or model downloads, pass --real-models to benchmark the models
+configured in SearchConfiguration instead. Results are written as JSON so they can be
+compared between commits.
+
+Run with: uv run python -m benchmarks.hot_paths [--output bench_results.json]
+"""
+
+import argparse
+import json
+import platform
+import resource
+import time
+import tracemalloc
+from dataclasses import asdict, replace
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, Dict, List, Optional
+
+from evaluator.data.file_io import load_ap_history_qa_set
+from evaluator.data.model_registry import register_model
+from evaluator.data.vector_search import (
+    SearchConfiguration,
+    VectorSearch,
+    clear_shared_indexes,
+)
+from evaluator.evals import basic, vector_rag
+from evaluator.models.qa import QACollection
+
+from benchmarks.stubs import (
+    HashingEmbedder,
+    OverlapCrossEncoder,
+    StubAnswerGenerator,
+    latency_summary,
+)
+
+STUB_EMBEDDING_MODEL = "stub/hashing-embedder"
+STUB_CROSS_ENCODER = "stub/overlap-cross-encoder"
+
+
+def _measure(fn: Callable[[], object]) -> Dict[str, float]:
+    """Runs fn once and reports its wall time and the peak traced Python/numpy memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        fn()
+        elapsed_s = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": elapsed_s, "peak_traced_mb": peak_bytes / 2**20}
+
+
+def benchmark_index_build(base_config: SearchConfiguration, backends: List[str]) -> Dict:
+    results: Dict = {}
+    for backend in backends:
+        config = replace(base_config, backend=backend, persist_index=False)
+        # Measure a cold build, not an index shared by an earlier VectorSearch
+        clear_shared_indexes()
+        results[backend] = _measure(lambda: VectorSearch(config))
+    return results
+
+
+def benchmark_query_latency(
+    base_config: SearchConfiguration, backends: List[str], questions: List[str]
+) -> Dict:
+    results: Dict = {}
+    for backend in backends:
+        for enable_reranking in (False, True):
+            config = replace(
+                base_config,
+                backend=backend,
+                enable_reranking=enable_reranking,
+                cache_results=False,
+                cache_rerank_scores=False,
+            )
+            search = VectorSearch(config)
+            # Warm up lazy model loading before timing
+            search.query(questions[0])
+
+            latencies = []
+            for question in questions:
+                start = time.perf_counter()
+                search.query(question)
+                latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            search.query_many(questions)
+            batched_s = time.perf_counter() - start
+
+            key = f"{backend}{'_reranking' if enable_reranking else ''}"
+            results[key] = {
+                **latency_summary(latencies),
+                "query_many_s": batched_s,
+                "query_many_questions_per_s": len(questions) / batched_s,
+            }
+    return results
+
+
+def benchmark_reranking(
+    base_config: SearchConfiguration, questions: List[str], rerank_margin: float
+) -> Dict:
+    """
+    Cost of reranking with the fixed candidate pool, with the adaptive pool and from a warm
+    score cache, and how often the adaptive pool returns the same chunks as the fixed one.
+    """
+    config = replace(
+        base_config, enable_reranking=True, cache_results=False, cache_rerank_scores=False
+    )
+    fixed = VectorSearch(config)
+    adaptive = VectorSearch(replace(config, rerank_margin=rerank_margin))
+    cached = VectorSearch(replace(config, cache_rerank_scores=True, persist_cache=False))
+
+    results: Dict = {"rerank_margin": rerank_margin}
+    outputs: Dict[str, List] = {}
+    for name, search in [("fixed_pool", fixed), ("adaptive_pool", adaptive)]:
+        scored_pairs = 0
+        predict = search._predict
+
+        def counting_predict(pairs, predict=predict):
+            nonlocal scored_pairs
+            scored_pairs += len(pairs)
+            return predict(pairs)
+
+        search.reranker._predict = counting_predict
+        start = time.perf_counter()
+        outputs[name] = search.query_many(questions)
+        elapsed_s = time.perf_counter() - start
+        results[name] = {"seconds": elapsed_s, "scored_pairs": scored_pairs}
+
+    results["adaptive_pool"]["same_results"] = sum(
+        a == b for a, b in zip(outputs["fixed_pool"], outputs["adaptive_pool"])
+    ) / max(1, len(questions))
+
+    cached.query_many(questions)
+    start = time.perf_counter()
+    cached.query_many(questions)
+    results["warm_score_cache"] = {"seconds": time.perf_counter() - start}
+    return results
+
+
+def benchmark_end_to_end(
+    base_config: SearchConfiguration,
+    qa_collection: QACollection,
+    llm_latency_s: float,
+    concurrency: int,
+) -> Dict:
+    def answer_generator(model_name: str, system_prompt: str):
+        return StubAnswerGenerator(model_name, system_prompt, latency_s=llm_latency_s)
+
+    num_questions = len(qa_collection.qa_map)
+    results: Dict = {}
+    with TemporaryDirectory() as tmpdir:
+        output_dir = Path(tmpdir)
+
+        basic_eval = basic.BasicEval(
+            models=["stub/model"],
+            qa_collection=qa_collection,
+            answer_generator=answer_generator,
+            output_dir=output_dir,
+            concurrency=concurrency,
+        )
+        measurement = _measure(lambda: basic_eval.run_model("stub/model"))
+        results["basic"] = {
+            **measurement,
+            "questions_per_s": num_questions / measurement["seconds"],
+        }
+
+        strategy = vector_rag.Strategy(
+            name="benchmark",
+            description="",
+            vector_search_config=replace(
+                base_config, enable_reranking=True, cache_results=False, cache_rerank_scores=False
+            ),
+        )
+        vector_rag_eval = vector_rag.VectorRAGEval(
+            models=["stub/model"],
+            qa_collection=qa_collection,
+            answer_generator=answer_generator,
+            vector_search_factory=VectorSearch,
+            output_dir=output_dir,
+            strategy=strategy,
+            concurrency=concurrency,
+        )
+        measurement = _measure(lambda: vector_rag_eval.run_model("stub/model"))
+        results["vector_rag_with_reranking"] = {
+            **measurement,
+            "questions_per_s": num_questions / measurement["seconds"],
+        }
+    return results
+
+
+def run_benchmarks(
+    real_models: bool,
+    backends: List[str],
+    chunking_style: str,
+    max_questions: Optional[int],
+    llm_latency_s: float,
+    concurrency: int,
+    rerank_margin: float = 0.05,
+) -> Dict:
+    base_config = SearchConfiguration(
+        chunking_style=chunking_style,
+        persist_cache=False,
+    )
+    if not real_models:
+        register_model("embedding", STUB_EMBEDDING_MODEL, HashingEmbedder())
+        register_model("cross_encoder", STUB_CROSS_ENCODER, OverlapCrossEncoder())
+        base_config = replace(
+            base_config,
+            embedding_model=STUB_EMBEDDING_MODEL,
+            cross_encoding_model=STUB_CROSS_ENCODER,
+        )
+
+    qa_collection = load_ap_history_qa_set()
+    if max_questions:
+        qa_collection = QACollection(
+            qa_map=dict(list(qa_collection.qa_map.items())[:max_questions])
+        )
+    questions = [qa.question for qa in qa_collection.qa_map.values()]
+
+    results: Dict = {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "real_models": real_models,
+        },
+        "search_configuration": asdict(base_config),
+        "questions": len(questions),
+        "index_build": benchmark_index_build(base_config, backends),
+        "query_latency": benchmark_query_latency(base_config, backends, questions),
+        "reranking": benchmark_reranking(
+            replace(base_config, backend=backends[0]), questions, rerank_margin
+        ),
+        "end_to_end": benchmark_end_to_end(
+            replace(base_config, backend=backends[0]),
+            qa_collection,
+            llm_latency_s=llm_latency_s,
+            concurrency=concurrency,
+        ),
+    }
+    # ru_maxrss is reported in KiB on Linux
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", type=Path, default=None, help="Write results to this file")
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy"])
+    parser.add_argument("--chunking-style", default="title_chunking")
+    parser.add_argument("--max-questions", type=int, default=None)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Stub LLM latency (s)")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--rerank-margin", type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        real_models=args.real_models,
+        backends=args.backends,
+        chunking_style=args.chunking_style,
+        max_questions=args.max_questions,
+        llm_latency_s=args.llm_latency,
+        concurrency=args.concurrency,
+        rerank_margin=args.rerank_margin,
+    )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+        print(f"Benchmark results written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
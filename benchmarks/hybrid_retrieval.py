@@ -0,0 +1,144 @@
+"""
+Compares dense and hybrid (BM25 + dense) retrieval on the concepts corpus.
+
+For every retriever and rerank candidate pool size the latency of retrieving and reranking
+the questions is measured, together with the recall of the final results against a
+reference: the cross-encoder's top results over the whole corpus. The smallest pool with which each
+retriever matches the recall of dense retrieval at the default pool size is reported.
+
+Stub embedding/cross-encoder models are used unless --real-models is passed.
+
+Run with: uv run python -m benchmarks.hybrid_retrieval [--pools 5 10 25]
+"""
+
+import argparse
+import json
+import time
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from evaluator.data.file_io import load_ap_history_qa_set
+from evaluator.data.model_registry import register_model
+from evaluator.data.vector_search import (
+    SearchConfiguration,
+    clear_shared_indexes,
+    create_context_retriever,
+)
+
+from benchmarks.hot_paths import STUB_CROSS_ENCODER, STUB_EMBEDDING_MODEL
+from benchmarks.stubs import HashingEmbedder, OverlapCrossEncoder, latency_summary
+
+
+def _recall(results: List[Optional[List[str]]], reference: List[Optional[List[str]]]) -> float:
+    found = sum(
+        len(set(hits or []) & set(expected or [])) for hits, expected in zip(results, reference)
+    )
+    total = sum(len(expected or []) for expected in reference)
+    return found / total if total else 1.0
+
+
+def benchmark_retrievers(
+    base_config: SearchConfiguration,
+    questions: List[str],
+    pools: List[int],
+    baseline_pool: int,
+    reference_pool: Optional[int] = None,
+) -> Dict:
+    # Reranking every chunk gives the results an unbounded candidate pool would return
+    search = create_context_retriever(base_config)
+    reference_pool = reference_pool or len(search.chunks)
+    reference = create_context_retriever(
+        replace(base_config, enable_reranking=True, rerank_candidates=reference_pool)
+    ).query_many(questions)
+
+    results: Dict = {"reference_pool": reference_pool, "retrievers": {}}
+    for retriever in ("dense", "hybrid"):
+        config = replace(base_config, retriever=retriever)
+
+        # Candidate retrieval alone, as used by strategies without reranking
+        search = create_context_retriever(config)
+        search.query(questions[0])
+        latencies = []
+        for question in questions:
+            start = time.perf_counter()
+            search.query(question)
+            latencies.append(time.perf_counter() - start)
+
+        by_pool: Dict[int, Dict] = {}
+        for pool in sorted(set(pools + [baseline_pool])):
+            search = create_context_retriever(
+                replace(config, enable_reranking=True, rerank_candidates=pool)
+            )
+            start = time.perf_counter()
+            pool_results = search.query_many(questions)
+            elapsed_s = time.perf_counter() - start
+            by_pool[pool] = {
+                "rerank_s": elapsed_s,
+                "questions_per_s": len(questions) / elapsed_s,
+                "recall_vs_reference": _recall(pool_results, reference),
+            }
+        results["retrievers"][retriever] = {
+            "retrieval_only": latency_summary(latencies),
+            "pools": by_pool,
+        }
+
+    # Candidate pool each retriever needs to match dense retrieval at the baseline pool
+    target = results["retrievers"]["dense"]["pools"][baseline_pool]["recall_vs_reference"]
+    results["baseline_pool"] = baseline_pool
+    results["target_recall"] = target
+    for retriever_results in results["retrievers"].values():
+        retriever_results["pool_for_equal_recall"] = next(
+            (
+                pool
+                for pool, pool_results in sorted(retriever_results["pools"].items())
+                if pool_results["recall_vs_reference"] >= target
+            ),
+            None,
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--real-models", action="store_true")
+    parser.add_argument("--chunking-style", default="title_chunking")
+    parser.add_argument("--max-questions", type=int, default=None)
+    parser.add_argument("--pools", type=int, nargs="+", default=[5, 10, 15, 20, 25, 50])
+    parser.add_argument(
+        "--reference-pool", type=int, default=None, help="Defaults to the whole corpus"
+    )
+    parser.add_argument("--baseline-pool", type=int, default=25)
+    args = parser.parse_args()
+
+    base_config = SearchConfiguration(
+        chunking_style=args.chunking_style,
+        backend="numpy",
+        persist_index=False,
+        cache_results=False,
+        cache_rerank_scores=False,
+    )
+    if not args.real_models:
+        register_model("embedding", STUB_EMBEDDING_MODEL, HashingEmbedder())
+        register_model("cross_encoder", STUB_CROSS_ENCODER, OverlapCrossEncoder())
+        base_config = replace(
+            base_config,
+            embedding_model=STUB_EMBEDDING_MODEL,
+            cross_encoding_model=STUB_CROSS_ENCODER,
+        )
+
+    questions = [qa.question for qa in load_ap_history_qa_set().qa_map.values()]
+    questions = questions[: args.max_questions]
+
+    clear_shared_indexes()
+    results = benchmark_retrievers(
+        base_config,
+        questions,
+        pools=args.pools,
+        reference_pool=args.reference_pool,
+        baseline_pool=args.baseline_pool,
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
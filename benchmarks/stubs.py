@@ -0,0 +1,99 @@
+"""
+Offline stand-ins for the embedding model, cross-encoder and LLM used by the benchmarks.
+"""
+
+import hashlib
+import re
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from evaluator.models.llm import LLMResponse
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words embedding using the hashing trick, mimics the
+    SentenceTransformer.encode interface.
+    """
+
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+        self._buckets: Dict[str, int] = {}
+
+    def _bucket(self, token: str) -> int:
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest, "little") % self.dim
+            self._buckets[token] = bucket
+        return bucket
+
+    def encode(
+        self,
+        sentences: Sequence[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs,
+    ) -> np.ndarray:
+        embeddings = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for token in _tokens(sentence):
+                embeddings[row, self._bucket(token)] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+        return embeddings
+
+
+class OverlapCrossEncoder:
+    """
+    Scores (query, document) pairs by token overlap, mimics CrossEncoder.predict.
+    """
+
+    def predict(
+        self, sentences: Sequence[Tuple[str, str]], batch_size: int = 32, **kwargs
+    ) -> np.ndarray:
+        scores = np.empty(len(sentences), dtype=np.float32)
+        for i, (query, document) in enumerate(sentences):
+            query_tokens = set(_tokens(query))
+            scores[i] = len(query_tokens.intersection(_tokens(document))) / (
+                len(query_tokens) or 1
+            )
+        return scores
+
+
+class StubAnswerGenerator:
+    """
+    Answers every question with 'A' after an optional simulated round trip.
+    """
+
+    def __init__(self, model_name: str, system_prompt: str, latency_s: float = 0.0) -> None:
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.latency_s = latency_s
+
+    def generate(self, question: str, context: Optional[List[str]] = None) -> LLMResponse:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return LLMResponse(answer="A")
+
+
+def latency_summary(latencies_s: Sequence[float]) -> Dict[str, float]:
+    latencies_ms = np.asarray(latencies_s, dtype=np.float64) * 1000
+    if latencies_ms.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(latencies_ms.size),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
@@ -0,0 +1,136 @@
+"""
+Compares the Chroma and NumPy vector search backends, and the int8/binary quantized NumPy
+index, on synthetic embeddings.
+
+Run with: uv run python -m benchmarks.vector_backends [--chunks N] [--queries N]
+"""
+
+import argparse
+import json
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from evaluator.data.vector_index import (
+    ChromaVectorIndex,
+    QUANTIZATIONS,
+    NumpyVectorIndex,
+    QuantizedVectorIndex,
+    VectorIndex,
+    create_chroma_client,
+    normalize_embeddings,
+)
+
+from benchmarks.stubs import latency_summary
+
+
+def benchmark_backends(
+    num_chunks: int, num_queries: int, dim: int, k: int, rescore_multiplier: int = 4
+) -> Dict:
+    rng = np.random.default_rng(0)
+    corpus = normalize_embeddings(rng.standard_normal((num_chunks, dim)))
+    queries = normalize_embeddings(rng.standard_normal((num_queries, dim)))
+    chunks = {str(i): f"chunk {i}" for i in range(num_chunks)}
+    embeddings_by_text = {f"chunk {i}": corpus[i] for i in range(num_chunks)}
+
+    embedded: List[str] = []
+
+    def embed(documents: List[str]) -> np.ndarray:
+        embedded.extend(documents)
+        return np.stack([embeddings_by_text[document] for document in documents])
+
+    index_metadata = {
+        "chunking_style": "benchmark",
+        "embedding_model": "synthetic",
+        "chunk_file_sha256": "",
+    }
+
+    start = time.perf_counter()
+    numpy_index = NumpyVectorIndex.build(chunks, embed)
+    numpy_build_s = time.perf_counter() - start
+
+    # The in-memory client is shared by the whole process, a unique collection makes sure
+    # the index is built rather than found from an earlier call
+    chroma_client = create_chroma_client(None)
+    index_key = f"benchmark_{num_chunks}_{dim}_{uuid.uuid4().hex}"
+    embedded.clear()
+    start = time.perf_counter()
+    chroma_index = ChromaVectorIndex(
+        client=chroma_client,
+        index_key=index_key,
+        index_metadata=index_metadata,
+        chunks=chunks,
+        embed=embed,
+    )
+    chroma_build_s = time.perf_counter() - start
+    if len(embedded) != num_chunks:
+        raise RuntimeError(f"Chroma index {index_key} was not built, build time is invalid")
+
+    results: Dict = {
+        "chunks": num_chunks,
+        "queries": num_queries,
+        "dim": dim,
+        "k": k,
+        "rescore_multiplier": rescore_multiplier,
+    }
+    # Name, index, build time and searched memory of every backend
+    indexes: List[Tuple[str, VectorIndex, float, Optional[int]]] = [
+        ("numpy", numpy_index, numpy_build_s, numpy_index.embeddings.nbytes),
+        ("chroma", chroma_index, chroma_build_s, None),
+    ]
+    for quantization in QUANTIZATIONS:
+        start = time.perf_counter()
+        quantized = QuantizedVectorIndex.quantize(numpy_index, quantization, rescore_multiplier)
+        indexes.append(
+            (f"numpy_{quantization}", quantized, time.perf_counter() - start, quantized.nbytes)
+        )
+
+    exact_ids, _ = numpy_index.search(queries, k)
+    for name, index, build_s, index_bytes in indexes:
+        latencies = []
+        hit_ids: List[List[str]] = []
+        for query in queries:
+            start = time.perf_counter()
+            ids, _ = index.search(query[np.newaxis, :], k)
+            latencies.append(time.perf_counter() - start)
+            hit_ids.extend(ids)
+
+        start = time.perf_counter()
+        index.search(queries, k)
+        batch_s = time.perf_counter() - start
+
+        recall = np.mean(
+            [len(set(hits) & set(exact)) / k for hits, exact in zip(hit_ids, exact_ids)]
+        )
+        results[name] = {
+            "build_s": build_s,
+            "batch_query_s": batch_s,
+            "recall_at_k": float(recall),
+            # Memory searched per query, quantized indexes only read the rescored float32 rows
+            "index_mb": index_bytes / 2**20 if index_bytes is not None else None,
+            **latency_summary(latencies),
+        }
+
+    chroma_client.delete_collection(chroma_index.collection.name)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=211)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("-k", type=int, default=25)
+    parser.add_argument("--rescore-multiplier", type=int, default=4)
+    args = parser.parse_args()
+
+    results = benchmark_backends(
+        args.chunks, args.queries, args.dim, args.k, rescore_multiplier=args.rescore_multiplier
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from unstructured.chunking.basic import chunk_elements
+from unstructured.chunking.title import chunk_by_title
+
+
+@dataclass
+class ChunkingVariant:
+    # Also the chunking style selected by SearchConfiguration.chunking_style
+    name: str
+    # "basic" packs sequential elements, "title" also starts a new chunk at every section title
+    strategy: str = "basic"
+    max_characters: int = 1000
+    new_after_n_chars: int = 800  # soft-max
+    overlap: int = 100  # helps retain semantic meaning from surrounding sentences
+    # Title strategy only: sections shorter than this are combined with the next one
+    combine_text_under_n_chars: int = 0
+
+    @property
+    def output(self) -> str:
+        return f"processed/ap_history_concepts_{self.name}.jsonl"
+
+    def fingerprint(self) -> str:
+        settings = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.sha256(settings.encode("utf-8")).hexdigest()[:16]
+
+    def chunk(self, elements: list, include_orig_elements: bool = False) -> list:
+        if self.strategy == "title":
+            return chunk_by_title(
+                elements,
+                include_orig_elements=include_orig_elements,
+                combine_text_under_n_chars=self.combine_text_under_n_chars,
+                max_characters=self.max_characters,
+                new_after_n_chars=self.new_after_n_chars,
+                overlap=self.overlap,
+            )
+        return chunk_elements(
+            elements,
+            include_orig_elements=include_orig_elements,
+            max_characters=self.max_characters,
+            new_after_n_chars=self.new_after_n_chars,
+            overlap=self.overlap,
+        )
+
+
+DEFAULT_CHUNKING_VARIANTS = [
+    ChunkingVariant(name="basic_chunking"),
+    ChunkingVariant(
+        name="title_chunking", strategy="title", overlap=0, combine_text_under_n_chars=50
+    ),
+]
+
+
+class StreamingChunker:
+    """
+    Chunks a document fed as a sequence of element batches, returning the chunk texts as
+    soon as they are final. Only the elements of the last chunk of a batch, which the next
+    batch may still extend, are held back, so memory does not grow with the document.
+    """
+
+    def __init__(self, variant: ChunkingVariant) -> None:
+        self.variant = variant
+        self._carried: list = []
+
+    def feed(self, elements: list) -> List[str]:
+        chunks = self.variant.chunk(self._carried + elements, include_orig_elements=True)
+        self._carried = []
+        # A chunk below the soft-max would have taken in the elements that follow it, unless
+        # it is the tail of an oversized element: that element is split into chunks of its
+        # own, the earlier ones were already returned
+        if chunks and len(chunks[-1].text) < self.variant.new_after_n_chars:
+            carried = list(chunks[-1].metadata.orig_elements or [])
+            if not any(self._is_oversized(element) for element in carried):
+                self._carried = carried
+                chunks = chunks[:-1]
+        return [chunk.text for chunk in chunks]
+
+    def flush(self) -> List[str]:
+        carried, self._carried = self._carried, []
+        return [chunk.text for chunk in self.variant.chunk(carried)] if carried else []
+
+    def _is_oversized(self, element) -> bool:
+        return len(element.text) > self.variant.max_characters
+
+
+def write_chunk_variants(
+    element_batches: Iterable[list], variants: List[ChunkingVariant], output_files: List[Path]
+) -> Dict[str, int]:
+    """
+    Chunks the element batches with every variant in a single pass and writes the chunks as
+    JSONL as they come, one {"id", "text"} object per line. The files are moved into place
+    once complete. Returns the number of chunks written per variant, empty on error.
+    """
+    chunkers = [StreamingChunker(variant) for variant in variants]
+    counts = [0] * len(variants)
+    tmp_files = [output_file.with_name(f".{output_file.name}.tmp") for output_file in output_files]
+
+    def write(f, i: int, texts: List[str]):
+        for text in texts:
+            f.write(json.dumps({"id": str(counts[i]), "text": text}) + "\n")
+            counts[i] += 1
+
+    files = []
+    try:
+        for tmp_file in tmp_files:
+            tmp_file.parent.mkdir(parents=True, exist_ok=True)
+            files.append(tmp_file.open("w", encoding="utf-8"))
+
+        for elements in element_batches:
+            for i, chunker in enumerate(chunkers):
+                write(files[i], i, chunker.feed(elements))
+        for i, chunker in enumerate(chunkers):
+            write(files[i], i, chunker.flush())
+
+        for f in files:
+            f.close()
+        for tmp_file, output_file in zip(tmp_files, output_files):
+            os.replace(tmp_file, output_file)
+    except OSError as e:
+        for f in files:
+            f.close()
+        for tmp_file in tmp_files:
+            tmp_file.unlink(missing_ok=True)
+        print(f"Error saving chunks to {output_files}: {e}")
+        return {}
+
+    return {variant.name: count for variant, count in zip(variants, counts)}
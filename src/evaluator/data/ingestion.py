@@ -0,0 +1,400 @@
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import replace
+from io import BytesIO
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader, PdfWriter
+from unstructured.partition.pdf import partition_pdf
+from unstructured.staging.base import elements_from_dicts, elements_to_dicts
+
+from evaluator.data.chunking import (
+    DEFAULT_CHUNKING_VARIANTS,
+    ChunkingVariant,
+    write_chunk_variants,
+)
+from evaluator.data.file_io import clean_cid_chars, read_json_from_file, write_json_to_file
+from evaluator.models.ingestion import IngestedQA, IngestedSource, IngestionManifest
+from evaluator.models.qa import QA, QACollection
+from evaluator.utils import file_sha256, get_data_path
+
+if TYPE_CHECKING:
+    # The search layer loads the embedding models, only needed to precompute embeddings
+    from evaluator.data.vector_search import SearchConfiguration
+
+# Question PDFs in numbering order: on the first ingestion questions are numbered from 0
+# across all of them, later ingestions keep the numbers of questions that still exist
+QA_PDFS = [
+    "raw/MC_1450-1750.pdf",
+    "raw/MC_600-1450.pdf",
+    "raw/MC_periods.pdf",
+]
+SOLUTION_GUIDE_PDF = "raw/ap_history_guide.pdf"
+
+QA_OUTPUT = "processed/ap_history_qa.json"
+MANIFEST_FILE = "processed/ingestion_manifest.json"
+ELEMENT_CACHE_DIR = "cache/elements"
+
+# A (question, answer) pair, the answer is empty if the last question has no answer page
+QAPages = Tuple[str, str]
+
+
+def ingest_sources(
+    max_workers: Optional[int] = None,
+    pages_per_task: int = 16,
+    chunking_variants: Optional[List[ChunkingVariant]] = None,
+    embedding_config: Optional["SearchConfiguration"] = None,
+):
+    """
+    Extracts the QA set and the solution guide concepts, chunked with every chunking variant,
+    from the raw PDFs. With an `embedding_config` the chunks of every variant are also
+    embedded with its model, so evaluations memory-map them instead of embedding them.
+
+    Ingestion is incremental: a manifest records the hash of every source PDF, of the pages
+    of every question and of the settings of every chunking variant. Unchanged sources are
+    skipped, only the changed questions of a changed source are extracted again and only
+    new or changed variants are chunked again. The work left is split into page ranges
+    extracted in parallel by a process pool.
+    """
+    chunking_variants = chunking_variants or DEFAULT_CHUNKING_VARIANTS
+    manifest_file = get_data_path(MANIFEST_FILE)
+    manifest = IngestionManifest()
+    if manifest_file.exists():
+        manifest = read_json_from_file(manifest_file, IngestionManifest) or manifest
+
+    source_files = {source: get_data_path(source) for source in [*QA_PDFS, SOLUTION_GUIDE_PDF]}
+    file_hashes = {source: file_sha256(pdf_file) for source, pdf_file in source_files.items()}
+
+    def is_changed(source: str) -> bool:
+        ingested = manifest.sources.get(source)
+        return ingested is None or ingested.file_sha256 != file_hashes[source]
+
+    changed_qa_sources = [source for source in QA_PDFS if is_changed(source)]
+    removed_sources = [source for source in manifest.sources if source not in source_files]
+    qa_output = get_data_path(QA_OUTPUT)
+    update_qa = bool(changed_qa_sources or removed_sources) or not qa_output.exists()
+
+    # Fingerprints of the variants already chunked from the current guide
+    guide = manifest.sources.get(SOLUTION_GUIDE_PDF)
+    chunked_variants: Dict[str, str] = {}
+    if guide is not None and not is_changed(SOLUTION_GUIDE_PDF):
+        chunked_variants = guide.chunking_variants
+    stale_variants = [
+        variant
+        for variant in chunking_variants
+        if chunked_variants.get(variant.name) != variant.fingerprint()
+        or not get_data_path(variant.output).exists()
+    ]
+
+    if not (update_qa or stale_variants):
+        print("Sources are unchanged, nothing to ingest")
+        if embedding_config is not None:
+            precompute_variant_embeddings(chunking_variants, embedding_config)
+        return
+
+    for source in removed_sources:
+        del manifest.sources[source]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        guide_elements: Iterator[list] = iter([])
+        if stale_variants:
+            # Bounded look-ahead keeps the memory of the guide ingestion independent of its size
+            guide_elements = cached_guide_elements(
+                executor,
+                source_files[SOLUTION_GUIDE_PDF],
+                file_hashes[SOLUTION_GUIDE_PDF],
+                pages_per_task,
+                2 * max_workers,
+            )
+
+        if update_qa:
+            update_qa_sources(
+                executor,
+                manifest,
+                {source: source_files[source] for source in changed_qa_sources},
+                file_hashes,
+                pages_per_task,
+            )
+            # The QA set is rebuilt from the manifest, which holds every extracted question
+            qa_collection = build_qa_collection(manifest, QA_PDFS)
+            if write_json_to_file(qa_output, qa_collection):
+                print(
+                    f"Ingested {len(qa_collection.qa_map)} questions, "
+                    f"{len(changed_qa_sources)} of {len(QA_PDFS)} PDFs changed"
+                )
+
+        if stale_variants:
+            # Every stale variant is chunked from the same pass over the guide elements
+            chunk_counts = write_chunk_variants(
+                guide_elements,
+                stale_variants,
+                [get_data_path(variant.output) for variant in stale_variants],
+            )
+            if chunk_counts:
+                print(f"Chunked the solution guide: {chunk_counts}")
+                chunked_variants = {
+                    **chunked_variants,
+                    **{variant.name: variant.fingerprint() for variant in stale_variants},
+                }
+                manifest.sources[SOLUTION_GUIDE_PDF] = IngestedSource(
+                    file_sha256=file_hashes[SOLUTION_GUIDE_PDF],
+                    chunking_variants=chunked_variants,
+                )
+
+    # Written last, so an interrupted ingestion is picked up again by the next run
+    write_json_to_file(manifest_file, manifest)
+
+    if embedding_config is not None:
+        precompute_variant_embeddings(chunking_variants, embedding_config)
+
+
+def precompute_variant_embeddings(
+    chunking_variants: List[ChunkingVariant], embedding_config: "SearchConfiguration"
+):
+    # Imported here so ingesting without embeddings never loads the embedding stack
+    from evaluator.data.vector_search import precompute_embeddings
+
+    # Embeddings that are up to date with the chunks are kept
+    for variant in chunking_variants:
+        precompute_embeddings(replace(embedding_config, chunking_style=variant.name))
+
+
+def update_qa_sources(
+    executor: Executor,
+    manifest: IngestionManifest,
+    pdf_files: Dict[str, Path],
+    file_hashes: Dict[str, str],
+    pages_per_task: int,
+):
+    """
+    Re-ingests the given question PDFs into the manifest. Questions whose pages are unchanged
+    are reused as they are, the others are extracted again and take over the number of the
+    question they replace, questions that are new get numbers after all existing ones.
+    """
+    next_q_number = 1 + max(
+        (qa.q_number for source in manifest.sources.values() for qa in source.questions),
+        default=-1,
+    )
+    pairs_per_task = max(1, pages_per_task // 2)
+
+    # Plan and submit the extraction of every source before waiting on any of them
+    plans = {}
+    for source, pdf_file in pdf_files.items():
+        pages_hashes = hash_qa_pages(pdf_file)
+        previous = manifest.sources.get(source)
+        previous_questions = previous.questions if previous else []
+
+        unchanged: Dict[str, List[IngestedQA]] = defaultdict(list)
+        for qa in previous_questions:
+            unchanged[qa.pages_sha256].append(qa)
+        questions: List[Optional[IngestedQA]] = [
+            unchanged[pages_sha256].pop(0) if unchanged[pages_sha256] else None
+            for pages_sha256 in pages_hashes
+        ]
+
+        # Question i is on page 1 + 2i, its answer on the page after
+        futures = [
+            (
+                pairs,
+                executor.submit(extract_qa_pages, pdf_file, 1 + 2 * pairs[0], 3 + 2 * pairs[-1]),
+            )
+            for pairs in _contiguous_runs(
+                [i for i, qa in enumerate(questions) if qa is None], pairs_per_task
+            )
+        ]
+        plans[source] = (pages_hashes, previous_questions, questions, futures)
+
+    for source, (pages_hashes, previous_questions, questions, futures) in plans.items():
+        reused_numbers = {qa.q_number for qa in questions if qa is not None}
+        for pairs, future in futures:
+            for i, (question, answer) in zip(pairs, future.result()):
+                # A changed question replaces the one at its position, if that one is gone
+                if i < len(previous_questions) and (
+                    previous_questions[i].q_number not in reused_numbers
+                ):
+                    q_number = previous_questions[i].q_number
+                else:
+                    q_number = next_q_number
+                    next_q_number += 1
+                reused_numbers.add(q_number)
+                questions[i] = IngestedQA(
+                    q_number=q_number,
+                    pages_sha256=pages_hashes[i],
+                    question=question,
+                    answer=answer,
+                )
+
+        manifest.sources[source] = IngestedSource(
+            file_sha256=file_hashes[source],
+            questions=[qa for qa in questions if qa is not None],
+        )
+
+
+def hash_qa_pages(pdf_file: Path) -> List[str]:
+    """
+    Hashes the content of every question page together with its answer page, the first page
+    is a cover and is skipped.
+    """
+    pages = PdfReader(pdf_file).pages
+    pages_hashes = []
+    for i in range(1, len(pages), 2):
+        digest = hashlib.sha256()
+        for page in pages[i : i + 2]:
+            contents = page.get_contents()
+            digest.update(contents.get_data() if contents is not None else b"")
+            digest.update(b"\0")
+        pages_hashes.append(digest.hexdigest())
+    return pages_hashes
+
+
+def extract_qa_pages(pdf_file: Path, start: int, stop: int) -> List[QAPages]:
+    """
+    Reads the pages [start, stop) of a question PDF, which alternate between a question and
+    the page with its answer.
+    """
+    reader = PdfReader(pdf_file)
+    pages = [page.extract_text() for page in reader.pages[start:stop]]
+    return [
+        (
+            _cleanup_text(pages[i]),
+            _extract_answer_option(pages[i + 1]) if i + 1 < len(pages) else "",
+        )
+        for i in range(0, len(pages), 2)
+    ]
+
+
+def build_qa_collection(manifest: IngestionManifest, sources: List[str]) -> QACollection:
+    qa_map: Dict[int, QA] = {}
+    for source in sources:
+        for qa in manifest.sources[source].questions:
+            qa_map[qa.q_number] = QA(question=qa.question, answer=qa.answer)
+    return QACollection(qa_map=dict(sorted(qa_map.items())))
+
+
+def stream_guide_elements(
+    executor: Executor, pdf_file: Path, pages_per_task: int, max_pending: int
+) -> Iterator[list]:
+    """
+    Partitions the solution guide page range by page range and yields the cleaned elements
+    of every range in page order. At most `max_pending` ranges are partitioned or waiting
+    to be consumed at any time, the first ones are submitted right away.
+    """
+    n_pages = len(PdfReader(pdf_file).pages)
+    page_ranges = (
+        (start, min(start + pages_per_task, n_pages)) for start in range(0, n_pages, pages_per_task)
+    )
+
+    def submit(page_range: Tuple[int, int]) -> Future:
+        return executor.submit(partition_guide_pages, pdf_file, *page_range)
+
+    pending = deque(submit(page_range) for page_range in islice(page_ranges, max_pending))
+
+    def results() -> Iterator[list]:
+        while pending:
+            elements = pending.popleft().result()
+            pending.extend(submit(page_range) for page_range in islice(page_ranges, 1))
+            yield elements
+
+    return results()
+
+
+def cached_guide_elements(
+    executor: Executor,
+    pdf_file: Path,
+    file_sha256: str,
+    pages_per_task: int,
+    max_pending: int,
+) -> Iterator[list]:
+    """
+    Yields the element batches of the solution guide from the element cache of its content
+    hash. On a cache miss the guide is partitioned and the batches are cached as they are
+    yielded, one JSON list per line, so later chunking runs don't partition the PDF again.
+    """
+    cache_file = get_data_path(f"{ELEMENT_CACHE_DIR}/{file_sha256}.jsonl")
+    if cache_file.exists():
+        print(f"Using the cached elements of {pdf_file.name}")
+
+        def cached() -> Iterator[list]:
+            with cache_file.open(encoding="utf-8") as f:
+                for line in f:
+                    yield elements_from_dicts(json.loads(line))
+
+        return cached()
+
+    # Submitted right away, so partitioning overlaps with the rest of the ingestion
+    batches = stream_guide_elements(executor, pdf_file, pages_per_task, max_pending)
+
+    def partitioned() -> Iterator[list]:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f".{cache_file.name}.tmp")
+        with tmp_file.open("w", encoding="utf-8") as f:
+            for elements in batches:
+                f.write(json.dumps(elements_to_dicts(elements)) + "\n")
+                yield elements
+        # Only a complete element list is cached
+        os.replace(tmp_file, cache_file)
+
+    return partitioned()
+
+
+def partition_guide_pages(pdf_file: Path, start: int, stop: int) -> list:
+    """Partitions the pages [start, stop) of the solution guide into cleaned elements."""
+    writer = PdfWriter()
+    for page in PdfReader(pdf_file).pages[start:stop]:
+        writer.add_page(page)
+    page_range = BytesIO()
+    writer.write(page_range)
+    page_range.seek(0)
+
+    elements = partition_pdf(
+        file=page_range,
+        strategy="fast",
+        infer_table_structure=False,
+        include_metadata=False,
+    )
+
+    for element in elements:
+        if hasattr(element, "text"):
+            element.text = clean_cid_chars(element.text)
+
+    return elements
+
+
+def _contiguous_runs(indices: List[int], max_length: int) -> List[List[int]]:
+    """Splits sorted indices into runs of consecutive indices of at most `max_length`."""
+    runs: List[List[int]] = []
+    for index in indices:
+        if runs and runs[-1][-1] == index - 1 and len(runs[-1]) < max_length:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+    return runs
+
+
+def _cleanup_text(text: str) -> str:
+    # Replace common explicit newlines/tabs with space
+    text = text.replace("\n", " ").replace("\r", " ").replace("\t", " ")
+    # Replace ALL sequences of whitespace characters
+    text = re.sub(r"\s+", " ", text)
+    # Strip leading/trailing whitespace from the page
+    text = text.strip()
+    return text
+
+
+def _extract_answer_option(text: str) -> str:
+    pattern = r"Answer:\s*([a-zA-Z])\s*"
+
+    match = re.search(pattern, text)
+
+    if match:
+        # Group 1 (index 1) refers to the content within the first parentheses in the pattern
+        return match.group(1)
+    else:
+        return ""
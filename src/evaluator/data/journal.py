@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, TextIO
+
+from evaluator.data.file_io import truncate_partial_line
+from evaluator.models.qa import QA
+
+
+class ResultJournal:
+    """
+    Append-only JSONL journal of the answers of one eval run. Every answer is written as
+    it arrives and fsync'ed in batches, so an interrupted run can be resumed by replaying
+    the journal on top of the last compacted JSON output.
+    """
+
+    def __init__(self, journal_file: Path, fsync_every: int = 16) -> None:
+        self.journal_file = journal_file
+        self.fsync_every = fsync_every
+        self._file: Optional[TextIO] = None
+        self._pending_sync = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "ResultJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def replay(self) -> Dict[int, QA]:
+        entries: Dict[int, QA] = {}
+        if not self.journal_file.exists():
+            return entries
+
+        with self.journal_file.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    entries[int(entry["q_number"])] = QA(
+                        question=entry.get("question", ""), answer=entry["answer"]
+                    )
+                except (json.JSONDecodeError, KeyError, ValueError):
+                    # A partially written last line from an interrupted run
+                    continue
+        return entries
+
+    def append(self, q_number: int, qa: QA):
+        line = json.dumps({"q_number": q_number, "question": qa.question, "answer": qa.answer})
+        with self._lock:
+            if self._file is None:
+                self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+                # Answers of a resumed run must not be appended to a line cut off mid-write
+                truncate_partial_line(self.journal_file)
+                self._file = self.journal_file.open("a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._pending_sync += 1
+            if self._pending_sync >= self.fsync_every:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Removes the journal once its answers were compacted into the JSON output."""
+        self.close()
+        self.journal_file.unlink(missing_ok=True)
+
+    def _sync(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending_sync = 0
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from evaluator.data.file_io import truncate_partial_line
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class JsonlLRUCache(Generic[K, V]):
+    """
+    Thread-safe in-memory LRU cache, optionally backed by an append-only JSONL file so
+    entries survive across runs. `encode` maps an entry to the JSON object of its line and
+    `decode` maps it back. Once the file holds `compact_ratio` times more lines than
+    `max_entries`, re-computed evicted entries having been appended again, it is rewritten
+    with the live entries.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[K, V], Dict[str, Any]],
+        decode: Callable[[Dict[str, Any]], Tuple[K, V]],
+        description: str,
+        max_entries: int,
+        cache_file: Optional[Path] = None,
+        compact_ratio: float = 2.0,
+    ) -> None:
+        self.max_entries = max_entries
+        self.cache_file = cache_file
+        self.compact_ratio = compact_ratio
+        # Lines in the cache file, live or not
+        self._file_lines = 0
+        self._encode = encode
+        self._decode = decode
+        # Names the entries in log messages
+        self._description = description
+        self._entries: OrderedDict[K, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+        if cache_file is not None:
+            self._load(cache_file)
+
+    def get(self, key: K) -> Optional[V]:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: Sequence[K]) -> List[Optional[V]]:
+        with self._lock:
+            values = []
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                values.append(value)
+            return values
+
+    def put(self, key: K, value: V):
+        self.put_many([key], [value])
+
+    def put_many(self, keys: Sequence[K], values: Sequence[V]):
+        with self._lock:
+            # Only entries not cached yet are appended to the file
+            new_entries = []
+            for key, value in zip(keys, values):
+                if key not in self._entries:
+                    new_entries.append((key, value))
+                self._remember(key, value)
+            if new_entries and self.cache_file is not None:
+                self._append(self.cache_file, new_entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: K, value: V):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, cache_file: Path):
+        if not cache_file.exists():
+            return
+
+        # Entries appended after a line cut off mid-write would be joined to it and lost
+        truncate_partial_line(cache_file)
+        with cache_file.open(encoding="utf-8") as f:
+            for line in f:
+                self._file_lines += 1
+                try:
+                    self._remember(*self._decode(json.loads(line)))
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    # A malformed line, e.g. written by an older version
+                    continue
+
+        print(f"Loaded {len(self._entries)} cached {self._description} from {cache_file}")
+        self._compact_if_needed(cache_file)
+
+    def _append(self, cache_file: Path, entries: List[Tuple[K, V]]):
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        lines = [json.dumps(self._encode(key, value)) + "\n" for key, value in entries]
+        try:
+            with cache_file.open("a", encoding="utf-8") as f:
+                f.writelines(lines)
+        except OSError as e:
+            print(f"Error saving {self._description} to {cache_file}: {e}")
+            return
+        self._file_lines += len(lines)
+        self._compact_if_needed(cache_file)
+
+    def _compact_if_needed(self, cache_file: Path):
+        if self._file_lines <= self.compact_ratio * self.max_entries:
+            return
+
+        # Least recently used first, so reloading the file restores the LRU order
+        tmp_cache_file = cache_file.with_name(f".{cache_file.name}.tmp")
+        try:
+            with tmp_cache_file.open("w", encoding="utf-8") as f:
+                f.writelines(
+                    json.dumps(self._encode(key, value)) + "\n"
+                    for key, value in self._entries.items()
+                )
+            os.replace(tmp_cache_file, cache_file)
+        except OSError as e:
+            tmp_cache_file.unlink(missing_ok=True)
+            print(f"Error compacting {self._description} in {cache_file}: {e}")
+            return
+        self._file_lines = len(self._entries)
@@ -0,0 +1,77 @@
+import re
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+
+from evaluator.data.vector_index import SearchHits, top_k
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    # Keeps names, years and other numbers as tokens, which is what the dense model misses
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory inverted index scoring chunks with Okapi BM25. The postings of every term are
+    stored as contiguous arrays of chunk indices and precomputed BM25 term weights, so
+    scoring a query is one scatter-add per query term.
+    """
+
+    def __init__(self, chunks: Dict[str, str], k1: float = 1.2, b: float = 0.75) -> None:
+        self.ids = list(chunks.keys())
+        self.k1 = k1
+        self.b = b
+
+        term_frequencies = [Counter(tokenize(text)) for text in chunks.values()]
+        lengths = np.array([sum(tf.values()) for tf in term_frequencies], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+
+        postings: Dict[str, List[int]] = {}
+        for chunk_idx, tf in enumerate(term_frequencies):
+            for term in tf:
+                postings.setdefault(term, []).append(chunk_idx)
+
+        num_chunks = len(self.ids)
+        # Length normalization of every chunk, shared by all of its terms
+        norms = k1 * (1 - b + b * lengths / avg_length)
+        self._postings: Dict[str, np.ndarray] = {}
+        self._weights: Dict[str, np.ndarray] = {}
+        for term, chunk_indices in postings.items():
+            indices = np.array(chunk_indices, dtype=np.int64)
+            tf_values = np.array(
+                [term_frequencies[idx][term] for idx in chunk_indices], dtype=np.float32
+            )
+            idf = np.log(1 + (num_chunks - len(indices) + 0.5) / (len(indices) + 0.5))
+            self._postings[term] = indices
+            weights = idf * tf_values * (k1 + 1) / (tf_values + norms[indices])
+            self._weights[term] = weights.astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, queries: List[str]) -> np.ndarray:
+        """BM25 score of every chunk for every query: (n_queries, n_chunks)."""
+        scores = np.zeros((len(queries), len(self.ids)), dtype=np.float32)
+        for row, query in enumerate(queries):
+            for term, count in Counter(tokenize(query)).items():
+                indices = self._postings.get(term)
+                if indices is not None:
+                    # Postings hold each chunk once, so plain fancy indexing accumulates
+                    scores[row, indices] += count * self._weights[term]
+        return scores
+
+    def search(self, queries: List[str], k: int) -> SearchHits:
+        if k <= 0 or not self.ids:
+            return [[] for _ in queries], [[] for _ in queries]
+        hit_ids, hit_scores = top_k(self.scores(queries), k, self.ids)
+
+        # Chunks sharing no term with the query are not lexical matches
+        for row, row_scores in enumerate(hit_scores):
+            matches = sum(1 for score in row_scores if score > 0)
+            hit_ids[row] = hit_ids[row][:matches]
+            hit_scores[row] = row_scores[:matches]
+        return hit_ids, hit_scores
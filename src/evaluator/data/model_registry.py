@@ -0,0 +1,46 @@
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from sentence_transformers import SentenceTransformer
+from sentence_transformers.cross_encoder import CrossEncoder
+
+# Process-wide models keyed by (kind, model name), shared by every VectorSearch instance
+_models: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+
+
+def get_embedding_model(model_name: str) -> SentenceTransformer:
+    return _get_or_load("embedding", model_name, SentenceTransformer)
+
+
+def get_cross_encoder(model_name: str) -> CrossEncoder:
+    return _get_or_load("cross_encoder", model_name, CrossEncoder)
+
+
+def register_model(kind: str, model_name: str, model: Any):
+    """
+    Makes `model` the shared instance for (kind, model_name), e.g. to plug in stub models.
+    """
+    with _lock:
+        _models[(kind, model_name)] = model
+
+
+def clear_models():
+    with _lock:
+        _models.clear()
+
+
+def _get_or_load(kind: str, model_name: str, loader: Callable[[str], Any]) -> Any:
+    key = (kind, model_name)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    # Loading under the lock guarantees each model is only loaded once per process
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            print(f"Loading {kind.replace('_', ' ')} model: {model_name}")
+            model = loader(model_name)
+            _models[key] = model
+        return model
@@ -0,0 +1,91 @@
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from evaluator.data.jsonl_cache import JsonlLRUCache
+
+# Scores a batch of (query, document) pairs, higher is more relevant
+PredictFunction = Callable[[List[Tuple[str, str]]], Sequence[float]]
+
+
+class RerankScoreCache(JsonlLRUCache[Tuple[str, str], float]):
+    """
+    LRU cache of cross-encoder scores keyed by (query, chunk id), optionally backed by a
+    JSONL file.
+    """
+
+    def __init__(self, max_entries: int = 100_000, cache_file: Optional[Path] = None) -> None:
+        super().__init__(
+            encode=lambda pair, score: {"query": pair[0], "chunk_id": pair[1], "score": score},
+            decode=lambda entry: ((entry["query"], entry["chunk_id"]), entry["score"]),
+            description="rerank scores",
+            max_entries=max_entries,
+            cache_file=cache_file,
+        )
+
+    def put_many(self, keys: Sequence[Tuple[str, str]], values: Sequence[float]):
+        # Cross-encoders return numpy scalars, which are not JSON serializable
+        super().put_many(keys, [float(value) for value in values])
+
+
+class Reranker:
+    """
+    Reorders the candidates of several queries by cross-encoder score. Pairs scored before
+    come from the cache, the remaining pairs of all queries are scored in one batch.
+    """
+
+    def __init__(
+        self, predict: PredictFunction, score_cache: Optional[RerankScoreCache] = None
+    ) -> None:
+        self._predict = predict
+        self.score_cache = score_cache
+
+    def rerank(
+        self,
+        queries: List[str],
+        candidate_ids: List[List[str]],
+        chunks: Dict[str, str],
+        limit: int,
+    ) -> List[List[str]]:
+        pairs = [
+            (query, chunk_id) for query, ids in zip(queries, candidate_ids) for chunk_id in ids
+        ]
+        scores: List[Optional[float]] = (
+            self.score_cache.get_many(pairs) if self.score_cache else [None] * len(pairs)
+        )
+
+        missing = [idx for idx, score in enumerate(scores) if score is None]
+        if missing:
+            missing_pairs = [pairs[idx] for idx in missing]
+            predicted = self._predict(
+                [(query, chunks[chunk_id]) for query, chunk_id in missing_pairs]
+            )
+            for idx, score in zip(missing, predicted):
+                scores[idx] = float(score)
+            if self.score_cache is not None:
+                self.score_cache.put_many(missing_pairs, predicted)
+
+        ranked_ids: List[List[str]] = []
+        offset = 0
+        for ids in candidate_ids:
+            query_scores = np.asarray(scores[offset : offset + len(ids)], dtype=np.float32)
+            offset += len(ids)
+            ranked = np.argsort(-query_scores, kind="stable")[:limit]
+            ranked_ids.append([ids[idx] for idx in ranked])
+        return ranked_ids
+
+
+def adaptive_pool_size(
+    scores: Sequence[float], keep: int, margin: float, min_candidates: int
+) -> int:
+    """
+    Number of candidates, sorted by descending retrieval score, worth reranking to pick the
+    best `keep`: those scoring within `margin` of the `keep`-th candidate. Candidates behind
+    a clear gap rarely make it into the top results, so they are not scored.
+    """
+    if len(scores) <= keep:
+        return len(scores)
+    threshold = scores[keep - 1] - margin
+    within_margin = sum(1 for score in scores if score >= threshold)
+    return min(len(scores), max(within_margin, min_candidates, keep))
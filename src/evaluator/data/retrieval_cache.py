@@ -0,0 +1,19 @@
+from pathlib import Path
+from typing import List, Optional
+
+from evaluator.data.jsonl_cache import JsonlLRUCache
+
+
+class RetrievalCache(JsonlLRUCache[str, List[str]]):
+    """
+    LRU cache of retrieval results keyed by query, optionally backed by a JSONL file.
+    """
+
+    def __init__(self, max_entries: int = 4096, cache_file: Optional[Path] = None) -> None:
+        super().__init__(
+            encode=lambda query, documents: {"query": query, "documents": documents},
+            decode=lambda entry: (entry["query"], entry["documents"]),
+            description="retrieval results",
+            max_entries=max_entries,
+            cache_file=cache_file,
+        )
@@ -0,0 +1,416 @@
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+import chromadb
+import numpy as np
+from numpy.typing import DTypeLike
+from chromadb import Collection, EmbeddingFunction
+from chromadb.api import ClientAPI
+
+# Maps a batch of texts to a (n_texts, dim) float32 matrix
+EmbedFunction = Callable[[List[str]], np.ndarray]
+
+# Chunk ids and similarity scores (higher is better) of the top hits of each query
+SearchHits = Tuple[List[List[str]], List[List[float]]]
+
+
+class VectorIndex(Protocol):
+    def search(self, query_embeddings: np.ndarray, k: int) -> SearchHits: ...
+
+
+class ChromaVectorIndex:
+    """
+    Approximate nearest neighbour index backed by a Chroma collection.
+    """
+
+    def __init__(
+        self,
+        client: ClientAPI,
+        index_key: str,
+        index_metadata: Dict[str, str],
+        chunks: Dict[str, str],
+        embed: EmbedFunction,
+        embedding_function: Optional[EmbeddingFunction] = None,
+    ) -> None:
+        self._embed = embed
+        self.collection = self._load_or_build_collection(
+            client, index_key, index_metadata, chunks, embedding_function
+        )
+
+    def search(self, query_embeddings: np.ndarray, k: int) -> SearchHits:
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=k,
+            include=["distances"],
+        )
+        ids = [list(query_ids) for query_ids in results.get("ids") or []]
+        distances = results.get("distances") or []
+        # Chroma returns distances, smaller is closer
+        scores = [[-float(distance) for distance in query_distances] for query_distances in distances]
+        return ids, scores
+
+    def _load_or_build_collection(
+        self,
+        client: ClientAPI,
+        index_key: str,
+        index_metadata: Dict[str, str],
+        chunks: Dict[str, str],
+        embedding_function: Optional[EmbeddingFunction],
+    ) -> Collection:
+        collection_name = f"ap_history_concepts_{index_key}"
+
+        self._drop_stale_collections(client, collection_name, index_metadata)
+
+        collection = client.get_or_create_collection(
+            name=collection_name, embedding_function=embedding_function
+        )
+
+        # Indexes are only marked complete once every chunk was upserted
+        if collection.metadata and collection.metadata.get("complete"):
+            print(f"Loaded vector search index: {collection_name}")
+            return collection
+
+        print("Building vector search")
+        ids = list(chunks.keys())
+        documents = list(chunks.values())
+        collection.upsert(documents=documents, ids=ids, embeddings=self._embed(documents))
+        collection.modify(metadata={**index_metadata, "complete": True})
+        return collection
+
+    def _drop_stale_collections(
+        self, client: ClientAPI, collection_name: str, index_metadata: Dict[str, str]
+    ):
+        # An index built from an older version of the same chunk file and model is invalid
+        for existing in client.list_collections():
+            name = existing if isinstance(existing, str) else existing.name
+            if name == collection_name:
+                continue
+            metadata = client.get_collection(name).metadata or {}
+            if _same_source(metadata, index_metadata):
+                print(f"Removing stale vector search index: {name}")
+                client.delete_collection(name)
+
+
+class NumpyVectorIndex:
+    """
+    Exact nearest neighbour index holding L2-normalized embeddings in a contiguous float32
+    matrix, top-k is one matrix multiply followed by argpartition.
+    """
+
+    def __init__(self, ids: List[str], embeddings: np.ndarray) -> None:
+        if len(ids) != embeddings.shape[0]:
+            raise ValueError(
+                f"Got {len(ids)} ids for {embeddings.shape[0]} embeddings"
+            )
+        self.ids = ids
+        self.embeddings = embeddings
+
+    @classmethod
+    def build(cls, chunks: Dict[str, str], embed: EmbedFunction) -> "NumpyVectorIndex":
+        print("Building vector search")
+        ids = list(chunks.keys())
+        embeddings = embed(list(chunks.values()))
+        return cls(ids, normalize_embeddings(embeddings, dtype=embeddings.dtype))
+
+    @classmethod
+    def load_or_build(
+        cls,
+        index_dir: Path,
+        index_key: str,
+        index_metadata: Dict[str, str],
+        chunks: Dict[str, str],
+        embed: EmbedFunction,
+        memory_map: bool = True,
+    ) -> "NumpyVectorIndex":
+        embeddings_file = index_dir / f"{index_key}.npy"
+        sidecar_file = index_dir / f"{index_key}.json"
+
+        index = cls.load(embeddings_file, sidecar_file, memory_map=memory_map)
+        if index is not None:
+            print(f"Loaded vector search index: {embeddings_file}")
+            return index
+
+        _drop_stale_files(index_dir, index_key, index_metadata)
+        index = cls.build(chunks, embed)
+        index.save(embeddings_file, sidecar_file, index_metadata)
+        return index
+
+    @classmethod
+    def load(
+        cls,
+        embeddings_file: Path,
+        sidecar_file: Path,
+        index_metadata: Optional[Dict[str, str]] = None,
+        memory_map: bool = True,
+    ) -> Optional["NumpyVectorIndex"]:
+        """
+        Loads a saved index, None if it does not exist or, when `index_metadata` is given,
+        was saved with different metadata.
+        """
+        if not (embeddings_file.exists() and sidecar_file.exists()):
+            return None
+        try:
+            sidecar = json.loads(sidecar_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+        if index_metadata is not None and any(
+            sidecar.get(key) != value for key, value in index_metadata.items()
+        ):
+            return None
+        embeddings = np.load(embeddings_file, mmap_mode="r" if memory_map else None)
+        return cls(sidecar["ids"], embeddings)
+
+    def save(self, embeddings_file: Path, sidecar_file: Path, index_metadata: Dict[str, str]):
+        embeddings_file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to temp files first so an interrupted save never leaves a partial index
+        tmp_embeddings_file = embeddings_file.with_suffix(".tmp.npy")
+        np.save(tmp_embeddings_file, self.embeddings)
+        os.replace(tmp_embeddings_file, embeddings_file)
+
+        tmp_sidecar_file = sidecar_file.with_suffix(".tmp")
+        tmp_sidecar_file.write_text(
+            json.dumps({**index_metadata, "ids": self.ids}), encoding="utf-8"
+        )
+        os.replace(tmp_sidecar_file, sidecar_file)
+
+    def search(self, query_embeddings: np.ndarray, k: int) -> SearchHits:
+        queries = normalize_embeddings(query_embeddings)
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return [[] for _ in range(len(queries))], [[] for _ in range(len(queries))]
+
+        # Cosine similarity of every query against every chunk: (n_queries, n_chunks)
+        scores = queries @ self.embeddings.T
+        return top_k(scores, k, self.ids)
+
+
+QUANTIZATIONS = ("int8", "binary")
+
+# Bits set in every byte value, popcount of packed binary codes is a table lookup
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(
+    axis=1, dtype=np.uint8
+)
+
+
+class QuantizedVectorIndex:
+    """
+    Exact-rescoring index over quantized embeddings: every chunk is scored against its int8
+    (4x smaller) or binary (32x smaller) code, then the best `k * rescore_multiplier`
+    candidates are rescored with their float32 embeddings. Only the codes need to be held
+    in memory, the float32 rows of a memory-mapped index are read when rescoring.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        codes: np.ndarray,
+        scales: Optional[np.ndarray],
+        quantization: str,
+        rescore_multiplier: int = 4,
+        block_size: int = 16384,
+    ) -> None:
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        if (scales is not None) != (quantization == "int8"):
+            raise ValueError("Scales are required for, and only for, int8 codes")
+        self.ids = ids
+        self.embeddings = embeddings
+        self.codes = codes
+        self.scales = scales
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+        # Rows of codes decoded at a time, bounds the float32 scratch memory
+        self.block_size = block_size
+
+    @classmethod
+    def quantize(
+        cls, index: NumpyVectorIndex, quantization: str, rescore_multiplier: int = 4
+    ) -> "QuantizedVectorIndex":
+        codes, scales = quantize_embeddings(index.embeddings, quantization)
+        return cls(index.ids, index.embeddings, codes, scales, quantization, rescore_multiplier)
+
+    @classmethod
+    def load_or_quantize(
+        cls,
+        index: NumpyVectorIndex,
+        index_dir: Path,
+        index_key: str,
+        quantization: str,
+        rescore_multiplier: int = 4,
+    ) -> "QuantizedVectorIndex":
+        # Codes are stored next to the float32 index they were computed from
+        codes_file = index_dir / f"{index_key}.{quantization}.npz"
+        if codes_file.exists():
+            with np.load(codes_file) as stored:
+                codes = stored["codes"]
+                scales = stored["scales"] if "scales" in stored else None
+            print(f"Loaded {quantization} quantized vector search index: {codes_file}")
+            return cls(index.ids, index.embeddings, codes, scales, quantization, rescore_multiplier)
+
+        quantized = cls.quantize(index, quantization, rescore_multiplier)
+        quantized.save(codes_file)
+        return quantized
+
+    def save(self, codes_file: Path):
+        codes_file.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so an interrupted save never leaves partial codes
+        tmp_codes_file = codes_file.with_name(f"{codes_file.stem}.tmp.npz")
+        if self.scales is not None:
+            np.savez(tmp_codes_file, codes=self.codes, scales=self.scales)
+        else:
+            np.savez(tmp_codes_file, codes=self.codes)
+        os.replace(tmp_codes_file, codes_file)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def search(self, query_embeddings: np.ndarray, k: int) -> SearchHits:
+        queries = normalize_embeddings(query_embeddings)
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return [[] for _ in range(len(queries))], [[] for _ in range(len(queries))]
+
+        # Shortlist on the quantized codes, then rank the shortlist by float32 similarity
+        n_candidates = min(len(self.ids), k * max(1, self.rescore_multiplier))
+        hit_ids: List[List[str]] = []
+        hit_scores: List[List[float]] = []
+        for query, candidates in zip(queries, self._shortlist(queries, n_candidates)):
+            # Only the shortlisted rows of a memory-mapped index are read from disk
+            candidates = np.sort(candidates)
+            rescored = self.embeddings[candidates] @ query
+            ids, scores = top_k(
+                rescored[np.newaxis, :], k, [self.ids[idx] for idx in candidates]
+            )
+            hit_ids.extend(ids)
+            hit_scores.extend(scores)
+        return hit_ids, hit_scores
+
+    def _shortlist(self, queries: np.ndarray, n_candidates: int) -> np.ndarray:
+        """
+        Indices of the n_candidates best chunks of every query by approximate score. Only a
+        running top-n is kept while scoring the codes block by block, so the scratch memory
+        is (n_queries, n_candidates + block_size) whatever the size of the index.
+        """
+        if self.scales is not None:
+            # Fold the per-dimension int8 scales into the queries instead of scaling the codes
+            scaled_queries = queries * self.scales
+
+            def score_block(block: np.ndarray) -> np.ndarray:
+                return scaled_queries @ block.T.astype(np.float32)
+
+        else:
+            query_codes = np.packbits(queries > 0, axis=1)
+
+            def score_block(block: np.ndarray) -> np.ndarray:
+                scores = np.empty((len(query_codes), len(block)), dtype=np.float32)
+                for row, query_code in enumerate(query_codes):
+                    # Negative hamming distance between the sign bits
+                    differing = _POPCOUNT[np.bitwise_xor(block, query_code)]
+                    scores[row] = -differing.sum(axis=1, dtype=np.float32)
+                return scores
+
+        best_indices = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.ids), self.block_size):
+            block = self.codes[start : start + self.block_size]
+            block_indices = np.arange(start, start + len(block), dtype=np.int64)
+            scores = np.concatenate([best_scores, score_block(block)], axis=1)
+            indices = np.concatenate(
+                [best_indices, np.broadcast_to(block_indices, (len(queries), len(block)))],
+                axis=1,
+            )
+            if scores.shape[1] > n_candidates:
+                keep = np.argpartition(-scores, n_candidates - 1, axis=1)[:, :n_candidates]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                indices = np.take_along_axis(indices, keep, axis=1)
+            best_scores, best_indices = scores, indices
+        return best_indices
+
+
+def quantize_embeddings(
+    embeddings: np.ndarray, quantization: str
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantizes (n, dim) embeddings. int8 codes use one symmetric scale per dimension,
+    x ~ code * scale, binary codes keep the sign of every dimension packed 8 per byte.
+    """
+    if quantization == "int8":
+        max_abs = np.abs(embeddings).max(axis=0) if len(embeddings) else np.ones(0)
+        scales = (np.where(max_abs > 0, max_abs, 1.0) / 127).astype(np.float32)
+        codes = np.clip(np.rint(embeddings / scales), -127, 127).astype(np.int8)
+        return codes, scales
+    if quantization == "binary":
+        return np.packbits(embeddings > 0, axis=1), None
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+
+def top_k(scores: np.ndarray, k: int, ids: List[str]) -> SearchHits:
+    """
+    Selects the k best scoring ids of every row in `scores`, sorted by descending score.
+    """
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), (scores.shape[0], k))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    top_indices = np.take_along_axis(candidates, order, axis=1)
+    top_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+    hit_ids = [[ids[idx] for idx in row] for row in top_indices]
+    return hit_ids, top_scores.tolist()
+
+
+def normalize_embeddings(embeddings: np.ndarray, dtype: DTypeLike = np.float32) -> np.ndarray:
+    # No copy is made when the input already is a contiguous array of the requested dtype
+    embeddings = np.ascontiguousarray(embeddings, dtype=dtype)
+    if embeddings.ndim == 1:
+        embeddings = embeddings[np.newaxis, :]
+    norms = np.sqrt(np.einsum("ij,ij->i", embeddings, embeddings, dtype=np.float32))[:, None]
+
+    # Embedders configured to normalize already produce unit vectors
+    nonzero = norms > 0
+    if np.allclose(norms[nonzero], 1.0, atol=1e-3):
+        return embeddings
+    return (embeddings / np.where(nonzero, norms, 1.0)).astype(dtype, copy=False)
+
+
+def _same_source(metadata: Dict, index_metadata: Dict[str, str]) -> bool:
+    # Only an index differing in the chunk file alone is replaced by the new one, indexes
+    # with other embedding settings may still be used by another strategy
+    return all(
+        metadata.get(key) == value
+        for key, value in index_metadata.items()
+        if key != "chunk_file_sha256"
+    )
+
+
+def _drop_stale_files(index_dir: Path, index_key: str, index_metadata: Dict[str, str]):
+    if not index_dir.exists():
+        return
+
+    for sidecar_file in index_dir.glob("*.json"):
+        if sidecar_file.stem == index_key:
+            continue
+        try:
+            metadata = json.loads(sidecar_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            continue
+        if _same_source(metadata, index_metadata):
+            print(f"Removing stale vector search index: {sidecar_file.with_suffix('.npy')}")
+            sidecar_file.with_suffix(".npy").unlink(missing_ok=True)
+            for codes_file in index_dir.glob(f"{sidecar_file.stem}.*.npz"):
+                codes_file.unlink(missing_ok=True)
+            sidecar_file.unlink(missing_ok=True)
+
+
+def create_chroma_client(persist_dir: Optional[Path]) -> ClientAPI:
+    if persist_dir is None:
+        return chromadb.Client()
+    return chromadb.PersistentClient(path=str(persist_dir))
@@ -1,35 +1,211 @@
+import hashlib
+import json
+import re
+import threading
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
 
-import chromadb
+import numpy as np
 from chromadb import Documents, EmbeddingFunction, Embeddings
 from sentence_transformers import SentenceTransformer
 from sentence_transformers.cross_encoder import CrossEncoder
 
 from evaluator.data.file_io import (
-    read_json_from_file,
+    read_concept_chunks,
 )
-from evaluator.models.qa import Concepts
-from evaluator.utils import get_data_path
+from evaluator.data.lexical_index import BM25Index
+from evaluator.data.model_registry import get_cross_encoder, get_embedding_model
+from evaluator.data.reranking import Reranker, RerankScoreCache, adaptive_pool_size
+from evaluator.data.retrieval_cache import RetrievalCache
+from evaluator.data.vector_index import (
+    ChromaVectorIndex,
+    EmbedFunction,
+    NumpyVectorIndex,
+    QuantizedVectorIndex,
+    SearchHits,
+    VectorIndex,
+    create_chroma_client,
+    normalize_embeddings,
+)
+from evaluator.instrumentation import tracer
+from evaluator.utils import file_sha256, get_data_path
+
+T = TypeVar("T")
 
 
 class CustomEmbedder(EmbeddingFunction):
-    def __init__(self, model_instance: SentenceTransformer) -> None:
-        self.model = model_instance
+    def __init__(
+        self,
+        model_instance: Optional[SentenceTransformer] = None,
+        batch_size: int = 64,
+        normalize: bool = True,
+        dtype: str = "float32",
+        model_name: Optional[str] = None,
+    ) -> None:
+        if model_instance is None and model_name is None:
+            raise ValueError("Either a model instance or a model name is required")
+        self._model = model_instance
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def model(self) -> SentenceTransformer:
+        # Named models are only loaded, through the shared registry, once they are used
+        if self._model is None:
+            self._model = get_embedding_model(str(self.model_name))
+        return self._model
+
+    def embed(self, documents: List[str]) -> np.ndarray:
+        # Keep the (n_documents, dim) matrix returned by SentenceTransformer as is,
+        # astype only copies when a different dtype was requested
+        embeddings = self.model.encode(
+            documents,
+            batch_size=self.batch_size,
+            normalize_embeddings=self.normalize,
+            convert_to_numpy=True,
+        )
+        return np.asarray(embeddings).astype(self.dtype, copy=False)
 
     def __call__(self, input: Documents) -> Embeddings:
-        # SentenceTransformer.encode returns a numpy array, convert to list of lists
-        response = self.model.encode(input).tolist()
-        return response
+        # Chroma accepts one numpy row per document, which are views into the same matrix
+        return list(self.embed(list(input)))
 
 
 @dataclass
 class SearchConfiguration:
     max_results: int = 3
     embedding_model: str = "all-MiniLM-L6-v2"
+    # Embeddings stay numpy arrays of this dtype from the model to the index
+    embedding_batch_size: int = 64
+    normalize_embeddings: bool = True
+    embedding_dtype: str = "float32"
     enable_reranking: bool = False
     cross_encoding_model: str = "cross-encoder/ms-marco-MiniLM-L6-v2"
     chunking_style: str = "title_chunking"
+    # Number of (query, document) pairs scored per cross-encoder batch
+    rerank_batch_size: int = 128
+    # Candidates retrieved per question for the cross-encoder to rerank
+    rerank_candidates: int = 25
+    # Only rerank the candidates whose retrieval score is within this margin of the
+    # max_results-th candidate, but at least min_rerank_candidates. The margin is in the
+    # retriever's score unit (cosine similarity for numpy, negative distance for chroma,
+    # fused rank score for hybrid), None always reranks every candidate
+    rerank_margin: Optional[float] = None
+    min_rerank_candidates: int = 10
+    # Cache cross-encoder scores per (question, chunk), shared by every retriever over the
+    # same chunks, persisted under data/cache when persist_cache is set
+    cache_rerank_scores: bool = True
+    rerank_cache_size: int = 100_000
+    # "dense" only searches the vector index, "hybrid" fuses it with a BM25 keyword index
+    retriever: str = "dense"
+    # Hybrid only: rank constant of the reciprocal rank fusion and the weight of the dense
+    # ranking, the BM25 ranking gets the rest
+    fusion_k: int = 60
+    dense_weight: float = 0.5
+    # Keep the index on disk and reuse it across runs as long as chunks and model match
+    persist_index: bool = True
+    # Index backend, "chroma" (HNSW) or "numpy" (exact search over an in-memory matrix)
+    backend: str = "chroma"
+    # Memory-map persisted numpy indexes instead of reading them into memory
+    memory_map_index: bool = True
+    # Numpy backend only: search int8 (4x smaller) or binary (32x smaller) codes of the
+    # embeddings and rescore the best max_results * rescore_multiplier candidates with the
+    # float32 embeddings, "none" searches the float32 embeddings directly. Memory only
+    # shrinks when the float32 embeddings are a persisted, memory-mapped index
+    quantization: str = "none"
+    rescore_multiplier: int = 4
+    # Use the chunk embeddings written by the pre-processing when they match this
+    # configuration, see precompute_embeddings
+    precomputed_embeddings: bool = True
+    # Cache retrieval results per question, optionally persisted under data/cache
+    cache_results: bool = True
+    cache_size: int = 4096
+    persist_cache: bool = True
+
+
+def _fingerprint(values: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+# Indexes and retrieval caches loaded by this process, keyed by what determines their content
+_shared: Dict[str, Any] = {}
+_shared_lock = threading.Lock()
+
+
+def _get_shared(key: str, load: Callable[[], T]) -> T:
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = load()
+        return _shared[key]
+
+
+def clear_shared_indexes():
+    """Drops the indexes and retrieval caches shared between VectorSearch instances."""
+    with _shared_lock:
+        _shared.clear()
+
+
+def concept_chunk_file(chunking_style: str) -> Path:
+    """Chunks of a chunking style, as written by the ingestion or from a JSON concepts file."""
+    chunk_file = get_data_path(f"processed/ap_history_concepts_{chunking_style}.jsonl")
+    if not chunk_file.exists():
+        chunk_file = chunk_file.with_suffix(".json")
+    return chunk_file
+
+
+def embedding_metadata(config: SearchConfiguration, chunk_file: Path) -> Dict[str, str]:
+    """Everything that changes the embeddings of the chunks in `chunk_file`."""
+    return {
+        "chunking_style": config.chunking_style,
+        "embedding_model": config.embedding_model,
+        "normalize_embeddings": str(config.normalize_embeddings),
+        "embedding_dtype": config.embedding_dtype,
+        "chunk_file_sha256": file_sha256(chunk_file),
+    }
+
+
+def embedding_artifact_files(chunk_file: Path, embedding_model: str) -> Tuple[Path, Path]:
+    """The .npy embeddings and the JSON sidecar (chunk ids, metadata) of a chunk file."""
+    stem = f"{chunk_file.name.split('.')[0]}.{re.sub(r'[^\w.-]+', '_', embedding_model)}"
+    return (
+        chunk_file.with_name(f"{stem}.embeddings.npy"),
+        chunk_file.with_name(f"{stem}.embeddings.json"),
+    )
+
+
+def precompute_embeddings(config: SearchConfiguration) -> bool:
+    """
+    Embeds the chunks of `config.chunking_style` with its embedding model and stores them
+    next to the chunk file, where VectorSearch memory-maps them instead of embedding the
+    chunks again. Up to date embeddings are kept. Returns whether the embeddings exist.
+    """
+    chunk_file = concept_chunk_file(config.chunking_style)
+    chunks = read_concept_chunks(chunk_file)
+    if not chunks:
+        print(f"No concepts found in file: {chunk_file}")
+        return False
+
+    metadata = embedding_metadata(config, chunk_file)
+    embeddings_file, sidecar_file = embedding_artifact_files(chunk_file, config.embedding_model)
+    if NumpyVectorIndex.load(embeddings_file, sidecar_file, metadata) is not None:
+        print(f"Precomputed embeddings are up to date: {embeddings_file}")
+        return True
+
+    embedder = CustomEmbedder(
+        model_name=config.embedding_model,
+        batch_size=config.embedding_batch_size,
+        normalize=config.normalize_embeddings,
+        dtype=config.embedding_dtype,
+    )
+    print(f"Embedding {len(chunks)} chunks of {chunk_file}")
+    # Stored as the model returns them, like the embeddings Chroma is given
+    index = NumpyVectorIndex(list(chunks.keys()), embedder.embed(list(chunks.values())))
+    index.save(embeddings_file, sidecar_file, metadata)
+    print(f"Precomputed embeddings written to {embeddings_file}")
+    return True
 
 
 class VectorSearch:
@@ -37,67 +213,302 @@ class VectorSearch:
         print(f"Configuring vector search with: {config}")
         self.max_results = config.max_results
         self.embedder = CustomEmbedder(
-            model_instance=SentenceTransformer(config.embedding_model)
+            model_name=config.embedding_model,
+            batch_size=config.embedding_batch_size,
+            normalize=config.normalize_embeddings,
+            dtype=config.embedding_dtype,
         )
         self.enable_reranking = config.enable_reranking
-        self.cross_encoder = CrossEncoder(config.cross_encoding_model)
+        self.cross_encoding_model = config.cross_encoding_model
 
-        # Configure in-memory vector db
-        client = chromadb.Client()
+        chunk_file = concept_chunk_file(config.chunking_style)
+        chunks = read_concept_chunks(chunk_file)
+        if not chunks:
+            raise RuntimeError(f"No concepts found in file: {chunk_file}")
 
-        # Init collection
-        self.collection = client.get_or_create_collection(
-            name="ap_history_concepts", embedding_function=self.embedder
+        # Indexes are keyed by everything that changes the stored embeddings
+        self.index_metadata: Dict[str, str] = embedding_metadata(config, chunk_file)
+        self.chunk_file = chunk_file
+        self.index_key = _fingerprint(self.index_metadata)
+        self.chunks: Dict[str, str] = chunks
+        # Strategies differing only in downstream settings share the loaded index
+        self.index = _get_shared(
+            f"index:{config.backend}:{config.persist_index}:{config.memory_map_index}:"
+            f"{config.quantization}:{config.rescore_multiplier}:{self.index_key}",
+            lambda: self._load_or_build_index(config),
         )
 
-        # Load chunks
-        chunk_file = get_data_path(
-            f"processed/ap_history_concepts_{config.chunking_style}.json"
+        # Total results to query
+        self.search_results: int = (
+            max(config.rerank_candidates, self.max_results)
+            if self.enable_reranking
+            else self.max_results
         )
-        concepts: Concepts | None = read_json_from_file(chunk_file, Concepts)
-        if not concepts:
-            raise RuntimeError(f"No concepts found in file: {chunk_file}")
-        self._build_vector_search_engine(concepts.chunks)
+        self.rerank_batch_size = config.rerank_batch_size
+        self.rerank_margin = config.rerank_margin
+        self.min_rerank_candidates = config.min_rerank_candidates
 
-        # Total results to query
-        self.search_results: int = 25 if self.enable_reranking else self.max_results
+        score_cache: Optional[RerankScoreCache] = None
+        if self.enable_reranking and config.cache_rerank_scores:
+            # Scores only depend on the cross-encoder and the chunk texts
+            score_key = _fingerprint(
+                {
+                    "cross_encoding_model": config.cross_encoding_model,
+                    "chunk_file_sha256": self.index_metadata["chunk_file_sha256"],
+                }
+            )
+            score_file = (
+                get_data_path(f"cache/rerank/{score_key}.jsonl") if config.persist_cache else None
+            )
+            score_cache = _get_shared(
+                f"rerank:{score_key}:{config.persist_cache}",
+                lambda: RerankScoreCache(
+                    max_entries=config.rerank_cache_size, cache_file=score_file
+                ),
+            )
+        self.reranker = Reranker(self._predict, score_cache)
 
-    def _build_vector_search_engine(self, chunks: Dict[str, str]):
-        print("Building vector search")
-        ids: list = []
-        documents: list = []
-        for concept_id, concept in chunks.items():
-            documents.append(concept)
-            ids.append(concept_id)
+        # Results only depend on the index and the retrieval settings, so they can be
+        # shared by every model evaluated against this configuration
+        self.retrieval_cache: Optional[RetrievalCache] = None
+        if config.cache_results:
+            retrieval_key = _fingerprint(
+                {
+                    "index_key": self.index_key,
+                    "backend": config.backend,
+                    "max_results": config.max_results,
+                    "enable_reranking": config.enable_reranking,
+                    "cross_encoding_model": config.cross_encoding_model,
+                    "search_results": self.search_results,
+                    **self._retrieval_settings(config),
+                }
+            )
+            cache_file = (
+                get_data_path(f"cache/retrieval/{retrieval_key}.jsonl")
+                if config.persist_cache
+                else None
+            )
+            # Shared in-process, two caches must never append to the same file
+            self.retrieval_cache = _get_shared(
+                f"retrieval:{retrieval_key}:{config.persist_cache}",
+                lambda: RetrievalCache(max_entries=config.cache_size, cache_file=cache_file),
+            )
 
-        self.collection.upsert(documents=documents, ids=ids)
+    def _retrieval_settings(self, config: SearchConfiguration) -> Dict[str, Any]:
+        # Settings of the candidate retrieval that change its results besides the index
+        settings: Dict[str, Any] = {}
+        if config.quantization != "none":
+            settings["quantization"] = config.quantization
+            settings["rescore_multiplier"] = config.rescore_multiplier
+        if config.enable_reranking and config.rerank_margin is not None:
+            settings["rerank_margin"] = config.rerank_margin
+            settings["min_rerank_candidates"] = config.min_rerank_candidates
+        return settings
+
+    def _load_or_build_index(self, config: SearchConfiguration) -> VectorIndex:
+        # Persisted indexes live under data/indexes/<backend>
+        index_dir = get_data_path(f"indexes/{config.backend}") if config.persist_index else None
+
+        # Embeddings written by the pre-processing replace embedding the chunks here
+        precomputed: Optional[NumpyVectorIndex] = None
+        if config.precomputed_embeddings:
+            precomputed = NumpyVectorIndex.load(
+                *embedding_artifact_files(self.chunk_file, config.embedding_model),
+                index_metadata=self.index_metadata,
+                memory_map=config.memory_map_index,
+            )
+            if precomputed is not None:
+                print(f"Using precomputed embeddings of {self.chunk_file}")
+
+        if config.backend == "chroma":
+            if config.quantization != "none":
+                raise ValueError("Quantized embeddings require the numpy backend")
+            return ChromaVectorIndex(
+                client=create_chroma_client(index_dir),
+                index_key=self.index_key,
+                index_metadata=self.index_metadata,
+                chunks=self.chunks,
+                embed=self._precomputed_embed(precomputed) if precomputed else self._embed,
+                embedding_function=self.embedder,
+            )
+
+        if config.backend == "numpy":
+            if precomputed is not None:
+                # A no-op for embeddings the model already normalized, keeps the memory map
+                embeddings = precomputed.embeddings
+                index = NumpyVectorIndex(
+                    precomputed.ids, normalize_embeddings(embeddings, dtype=embeddings.dtype)
+                )
+            elif index_dir is None:
+                index = NumpyVectorIndex.build(self.chunks, self._embed)
+            else:
+                index = NumpyVectorIndex.load_or_build(
+                    index_dir,
+                    self.index_key,
+                    self.index_metadata,
+                    self.chunks,
+                    self._embed,
+                    memory_map=config.memory_map_index,
+                )
+            if config.quantization == "none":
+                return index
+            if index_dir is None:
+                return QuantizedVectorIndex.quantize(
+                    index, config.quantization, config.rescore_multiplier
+                )
+            return QuantizedVectorIndex.load_or_quantize(
+                index, index_dir, self.index_key, config.quantization, config.rescore_multiplier
+            )
+
+        raise ValueError(f"Unknown vector search backend: {config.backend}")
+
+    def _embed(self, documents: List[str]) -> np.ndarray:
+        return self.embedder.embed(documents)
+
+    def _precomputed_embed(self, precomputed: NumpyVectorIndex) -> EmbedFunction:
+        # Chunks are embedded by text, duplicate texts share the same embedding
+        row_of = {self.chunks[chunk_id]: row for row, chunk_id in enumerate(precomputed.ids)}
+
+        def embed(documents: List[str]) -> np.ndarray:
+            return np.asarray(precomputed.embeddings[[row_of[document] for document in documents]])
+
+        return embed
+
+    @property
+    def cross_encoder(self) -> CrossEncoder:
+        # Only strategies that rerank ever load the cross-encoder
+        return get_cross_encoder(self.cross_encoding_model)
 
     def query(self, query: str) -> Optional[List[str]]:
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=self.search_results,
-            include=["documents", "distances", "metadatas"],
-        )
+        return self.query_many([query])[0]
 
-        documents = results.get("documents", [])
-        if not documents or not documents[0]:
-            return None
+    def query_many(self, queries: List[str]) -> List[Optional[List[str]]]:
+        """
+        Retrieves the context for several queries at once: queries are embedded in one
+        batched encode, looked up with a single multi-query call and all (query, candidate)
+        pairs are scored together by the cross-encoder.
+        """
+        results: Dict[str, Optional[List[str]]] = {}
+        queries_to_search: List[str] = []
+        for query in dict.fromkeys(queries):
+            cached_results = self.retrieval_cache.get(query) if self.retrieval_cache else None
+            if cached_results is not None:
+                results[query] = cached_results or None
+            else:
+                queries_to_search.append(query)
 
-        # Store the documents corresponding to the first and only search query
-        search_results = documents[0]
+        if queries_to_search:
+            for query, search_results in zip(
+                queries_to_search, self._search_many(queries_to_search)
+            ):
+                results[query] = search_results
+                if self.retrieval_cache is not None:
+                    self.retrieval_cache.put(query, search_results or [])
+
+        return [results[query] for query in queries]
+
+    def _search_many(self, queries: List[str]) -> List[Optional[List[str]]]:
+        with tracer.stage("embedding", items=len(queries)):
+            query_embeddings = self._embed(queries)
+        hit_ids, hit_scores = self._candidates(queries, query_embeddings)
+        hit_ids += [[] for _ in range(len(queries) - len(hit_ids))]
+        hit_scores += [[] for _ in range(len(queries) - len(hit_scores))]
 
         if not self.enable_reranking:
-            return search_results[: self.max_results]
+            return [self._texts(chunk_ids[: self.max_results]) for chunk_ids in hit_ids]
+
+        if self.rerank_margin is not None:
+            # Skip the candidates behind a clear gap in retrieval score
+            hit_ids = [
+                chunk_ids[
+                    : adaptive_pool_size(
+                        scores, self.max_results, self.rerank_margin, self.min_rerank_candidates
+                    )
+                ]
+                for chunk_ids, scores in zip(hit_ids, hit_scores)
+            ]
+
+        # Score the candidates of every query in one batched cross-encoder pass
+        with tracer.stage("reranking", items=len(queries)):
+            ranked_ids = self.reranker.rerank(queries, hit_ids, self.chunks, self.max_results)
+        return [self._texts(chunk_ids) for chunk_ids in ranked_ids]
+
+    def _texts(self, chunk_ids: List[str]) -> Optional[List[str]]:
+        return [self.chunks[chunk_id] for chunk_id in chunk_ids] or None
+
+    def _predict(self, pairs: List[Tuple[str, str]]) -> Sequence[float]:
+        return self.cross_encoder.predict(pairs, batch_size=self.rerank_batch_size)
+
+    def _candidates(self, queries: List[str], query_embeddings: np.ndarray) -> SearchHits:
+        with tracer.stage("vector_lookup", items=len(queries)):
+            return self.index.search(query_embeddings, self.search_results)
+
+
+class HybridSearch(VectorSearch):
+    """
+    Retrieves candidates from both the dense index and a BM25 keyword index over the same
+    chunks and fuses the two rankings, so exact names and dates in a question are matched
+    even when the embedding does not capture them.
+    """
+
+    def __init__(self, config: SearchConfiguration) -> None:
+        super().__init__(config)
+        self.fusion_k = config.fusion_k
+        self.dense_weight = config.dense_weight
+        # The keyword index only depends on the chunks, any strategy using them shares it
+        self.lexical_index = _get_shared(
+            f"bm25:{self.index_metadata['chunk_file_sha256']}",
+            lambda: BM25Index(self.chunks),
+        )
+
+    def _retrieval_settings(self, config: SearchConfiguration) -> Dict[str, Any]:
+        return {
+            **super()._retrieval_settings(config),
+            "retriever": config.retriever,
+            "fusion_k": config.fusion_k,
+            "dense_weight": config.dense_weight,
+        }
+
+    def _candidates(self, queries: List[str], query_embeddings: np.ndarray) -> SearchHits:
+        dense_ids, _ = super()._candidates(queries, query_embeddings)
+        with tracer.stage("lexical_lookup", items=len(queries)):
+            lexical_ids, _ = self.lexical_index.search(queries, self.search_results)
+
+        dense_ids += [[] for _ in range(len(queries) - len(dense_ids))]
+        fused = [
+            reciprocal_rank_fusion(
+                [dense, lexical],
+                weights=[self.dense_weight, 1 - self.dense_weight],
+                k=self.fusion_k,
+                limit=self.search_results,
+            )
+            for dense, lexical in zip(dense_ids, lexical_ids)
+        ]
+        return [ids for ids, _ in fused], [scores for _, scores in fused]
+
 
-        ranks = self.cross_encoder.rank(query, search_results)
+def reciprocal_rank_fusion(
+    rankings: List[List[str]], weights: List[float], k: int = 60, limit: Optional[int] = None
+) -> Tuple[List[str], List[float]]:
+    """
+    Merges rankings of ids by the weighted sum of 1 / (k + rank) over the rankings each id
+    appears in. Ranks are used instead of scores, so BM25 and cosine scores need no common
+    scale and an id missing from one ranking simply gets nothing from it. Returns the fused
+    ids and scores, best first.
+    """
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item_id in enumerate(ranking, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + weight / (k + rank)
+    # Ties keep the order of first appearance, i.e. the dense ranking first
+    ids = sorted(fused, key=lambda item_id: -fused[item_id])[:limit]
+    return ids, [fused[item_id] for item_id in ids]
 
-        final_results: List[str] = []
-        for rank in ranks[: self.max_results]:
-            element_idx: int | float | str = rank["corpus_id"]
-            try:
-                element_idx = int(element_idx)
-            except ValueError:
-                raise RuntimeError(f"'corpus_id' is not a valid integer: {element_idx}")
-            final_results.append(search_results[element_idx])
 
-        return final_results
+def create_context_retriever(config: SearchConfiguration) -> VectorSearch:
+    """Builds the retriever selected by `config.retriever`."""
+    if config.retriever == "hybrid":
+        return HybridSearch(config)
+    if config.retriever == "dense":
+        return VectorSearch(config)
+    raise ValueError(f"Unknown retriever: {config.retriever}")
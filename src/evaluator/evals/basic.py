@@ -1,15 +1,21 @@
 from collections import defaultdict
+from contextlib import nullcontext
 from itertools import islice
 from pathlib import Path
 from typing import Dict, List, Optional
 
-from rich.progress import track
+from rich.progress import Progress
 
 from evaluator.data.file_io import (
+    is_output_complete,
     read_json_from_file,
     write_json_to_file,
 )
+from evaluator.data.journal import ResultJournal
+from evaluator.evals.scheduling import generate_concurrently, run_models_concurrently
 from evaluator.evals.scoring import score_model_outputs
+from evaluator.instrumentation import tracer
+from evaluator.models.llm import LLMResponse
 from evaluator.models.qa import QA, QACollection, default_qa
 from evaluator.utils import get_normalized_model_name
 
@@ -22,6 +28,10 @@ class BasicEval:
         answer_generator,
         output_dir: Path,
         max_questions: Optional[int] = None,
+        concurrency: int = 1,
+        max_parallel_models: int = 1,
+        backend_limits: Optional[Dict[str, int]] = None,
+        batch_size: int = 1,
     ) -> None:
         self.models = models
 
@@ -32,6 +42,16 @@ class BasicEval:
         # Determine total number of questions to evaluate
         self.max_questions: int = max_questions or len(qa_collection.qa_map)
 
+        # Number of questions kept in flight per model
+        self.concurrency = concurrency
+
+        # Number of questions packed into a single LLM request, 1 disables batching
+        self.batch_size = max(1, batch_size)
+
+        # Number of models evaluated at the same time, optionally capped per backend
+        self.max_parallel_models = max_parallel_models
+        self.backend_limits = backend_limits or {}
+
         # Dir where the eval outputs will be stored
         self._eval_dir = Path(f"{output_dir}/basic")
 
@@ -57,22 +77,69 @@ class BasicEval:
             /no_think
             """
 
+        # Batched requests ask several numbered questions and expect one entry per question
+        self._batch_system_prompt = """
+            You are an expert in multiple-choice questions. You are given several numbered questions at once. For each question, answer with only the letter corresponding to the correct answer.
+            Do not include any additional text, explanations, or the content of the answer option itself.
+
+            Example Input Format:
+            Question 1:
+            What is the capital of France?
+            A) Berlin
+            B) Madrid
+            C) Paris
+            D) Rome
+
+            Question 2:
+            What is the largest ocean?
+            A) Atlantic
+            B) Pacific
+            C) Indian
+            D) Arctic
+
+            Example Output Format:
+            One entry per question holding its question number and the letter of its answer:
+            question_number 1, answer C
+            question_number 2, answer B
+
+            When only a single question is given, answer it with only the letter of the correct option.
+
+            Your Task:
+            Answer every one of the following multiple-choice questions by providing only the letter of the correct option.
+            /no_think
+            """
+
     def run_eval(self):
         print(f"Running {self.__class__.__name__}")
-        for model_name in self.models:
-            self._generate_answers(model_name)
+        with Progress() if self.max_parallel_models > 1 else nullcontext() as progress:
+            # Models running in parallel share a single progress display
+            run_models_concurrently(
+                self.models,
+                lambda model_name: self.run_model(model_name, progress),
+                max_parallel_models=self.max_parallel_models,
+                backend_limits=self.backend_limits,
+            )
 
-        self._score()
+        self.score()
 
-    def _generate_answers(self, model_name: str):
+    def run_model(self, model_name: str, progress: Optional[Progress] = None):
+        """
+        Answers the questions `model_name` has not answered yet and saves its output. Given a
+        `progress`, its answer progress is shown there instead of in a display of its own.
+        """
         model_name_str = get_normalized_model_name(model_name)
         print(f"{model_name_str}: Starting evaluation")
 
         # Path for output file
-        output_file = Path(f"{self._eval_dir}/{model_name_str}.json")
+        output_file = self._output_file(model_name)
 
-        # Init llm
+        # Init llm, batches get a generator prompted for several questions per request
         gen = self._answer_generator(model_name, self._system_prompt)
+        batch_gen = (
+            self._answer_generator(model_name, self._batch_system_prompt)
+            if self.batch_size > 1
+            else gen
+        )
 
         model_response_set: Dict[int, QA] = defaultdict(default_qa)
         # Load existing responses if any
@@ -82,31 +149,71 @@ class BasicEval:
                 model_response_set = existing_collection.qa_map
                 print(f"{model_name_str}: Loaded the already existing output")
 
-        questions_to_answer = [
-            q_number for q_number in islice(self._qa_set, self.max_questions)
-        ]
+        # Answers of an interrupted run are recovered from its journal
+        journal = ResultJournal(output_file.with_suffix(".jsonl"))
+        journaled_responses = journal.replay()
+        if journaled_responses:
+            model_response_set.update(journaled_responses)
+            print(
+                f"{model_name_str}: Recovered {len(journaled_responses)} answers from the journal"
+            )
 
-        for q_number in track(
-            questions_to_answer, description=f"{model_name_str}: Generating answers"
-        ):
-            if (
+        questions_to_answer = [
+            q_number
+            for q_number in islice(self._qa_set, self.max_questions)
+            if not (
                 q_number in model_response_set
                 and model_response_set[q_number].answer != ""
-            ):  # Skip if already answered
-                continue
+            )  # Skip if already answered
+        ]
 
-            qa = self._qa_set[q_number]
-            response = gen.generate(qa.question)
-            model_response_set[q_number] = QA(
-                question="", answer=response.answer.upper()
+        # Work items are batches of question numbers answered by a single request
+        batches = [
+            questions_to_answer[i : i + self.batch_size]
+            for i in range(0, len(questions_to_answer), self.batch_size)
+        ]
+
+        def answer_batch(batch: List[int]) -> Dict[int, LLMResponse]:
+            if len(batch) == 1:
+                return {batch[0]: gen.generate(self._qa_set[batch[0]].question)}
+            return batch_gen.generate_batch(
+                {q_number: self._qa_set[q_number].question for q_number in batch}
             )
 
-        # Save updated response set
+        with journal:
+            # Progress counts questions, so runs with different batch sizes compare
+            for _, responses in generate_concurrently(
+                batches,
+                answer_batch,
+                concurrency=self.concurrency,
+                description=f"{model_name_str}: Generating answers",
+                progress=progress,
+                size=len,
+            ):
+                for q_number, response in responses.items():
+                    qa = QA(question="", answer=response.answer.upper())
+                    model_response_set[q_number] = qa
+                    with tracer.stage("result_write"):
+                        journal.append(q_number, qa)
+
+        # Compact the journal into the JSON output
         model_response_collection = QACollection(qa_map=model_response_set)
-        if write_json_to_file(output_file, model_response_collection):
+        with tracer.stage("result_write"):
+            saved = write_json_to_file(output_file, model_response_collection)
+        if saved:
+            journal.discard()
             print(f"{model_name_str}: Eval completed")
 
-    def _score(self):
+    def is_completed(self, model_name: str) -> bool:
+        """Whether the saved output of `model_name` already answers every question."""
+        return is_output_complete(
+            self._output_file(model_name), islice(self._qa_set, self.max_questions)
+        )
+
+    def _output_file(self, model_name: str) -> Path:
+        return Path(f"{self._eval_dir}/{get_normalized_model_name(model_name)}.json")
+
+    def score(self):
         ground_truth: QACollection = self._qa_collection
         evals = self._eval_dir
         score_model_outputs(ground_truth, evals)
@@ -0,0 +1,133 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple, TypeVar
+
+from rich.progress import Progress, track
+
+from evaluator.instrumentation import tracer
+from evaluator.utils import get_model_backend, get_normalized_model_name
+
+K = TypeVar("K")
+R = TypeVar("R")
+
+
+def generate_concurrently(
+    items: Sequence[K],
+    task: Callable[[K], R],
+    concurrency: int,
+    description: str,
+    progress: Optional[Progress] = None,
+    size: Optional[Callable[[K], int]] = None,
+) -> Iterator[Tuple[K, R]]:
+    """
+    Runs `task` for every item keeping up to `concurrency` calls in flight and yields
+    (item, result) pairs in completion order.
+
+    When a shared `progress` display is given the task is rendered as one of its bars,
+    which allows several models to report progress at the same time. `size` counts the
+    progress units of an item, e.g. the questions of a batch, by default every item is one.
+    """
+    if progress is None and size is None:
+        return _run_tasks(items, task, concurrency, description=description)
+    return _advance_progress(items, task, concurrency, description, progress, size)
+
+
+def _advance_progress(
+    items: Sequence[K],
+    task: Callable[[K], R],
+    concurrency: int,
+    description: str,
+    progress: Optional[Progress],
+    size: Optional[Callable[[K], int]],
+) -> Iterator[Tuple[K, R]]:
+    units = size or (lambda item: 1)
+    with Progress() if progress is None else nullcontext(progress) as display:
+        task_id = display.add_task(description, total=sum(units(item) for item in items))
+        for item, result in _run_tasks(items, task, concurrency, progress=False):
+            display.advance(task_id, units(item))
+            yield item, result
+
+
+def _run_tasks(
+    items: Sequence[K],
+    task: Callable[[K], R],
+    concurrency: int,
+    description: str = "",
+    progress: bool = True,
+) -> Iterator[Tuple[K, R]]:
+    if concurrency <= 1:
+        ordered: Iterable[K] = items
+        if progress:
+            ordered = track(items, total=len(items), description=description)
+        for item in ordered:
+            yield item, task(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Workers run in a copy of the caller's context so traces keep the model label
+        futures: Dict[Future[R], K] = {
+            executor.submit(contextvars.copy_context().run, task, item): item for item in items
+        }
+        completed: Iterable[Future[R]] = as_completed(futures)
+        if progress:
+            completed = track(completed, total=len(futures), description=description)
+        try:
+            for future in completed:
+                yield futures[future], future.result()
+        finally:
+            # Don't leave queued requests running if the consumer bails out early
+            for future in futures:
+                future.cancel()
+
+
+def run_models_concurrently(
+    models: Sequence[K],
+    run_model: Callable[[K], None],
+    max_parallel_models: int,
+    backend_limits: Optional[Dict[str, int]] = None,
+    model_of: Callable[[K], str] = str,
+) -> None:
+    """
+    Runs `run_model` for every model with up to `max_parallel_models` models in flight.
+    `backend_limits` caps how many models of the same backend (e.g. "ollama") may run at
+    once, backends without an entry are only bounded by `max_parallel_models`.
+
+    Items may also be units of work of a model (e.g. one model under one strategy), in which
+    case `model_of` returns the model name of an item.
+    """
+    def run_traced(item: K) -> None:
+        with tracer.model(get_normalized_model_name(model_of(item))):
+            run_model(item)
+
+    if max_parallel_models <= 1:
+        for item in models:
+            run_traced(item)
+        return
+
+    backend_limits = backend_limits or {}
+    backend_slots: Dict[str, threading.BoundedSemaphore] = {
+        backend: threading.BoundedSemaphore(limit) for backend, limit in backend_limits.items()
+    }
+
+    model_slots = threading.BoundedSemaphore(max_parallel_models)
+
+    def run_with_backend_slot(item: K) -> None:
+        # Take the backend slot first so models waiting on a busy backend don't hold
+        # a global slot that a model of another backend could use
+        backend_slot = backend_slots.get(get_model_backend(model_of(item)))
+        with backend_slot if backend_slot is not None else nullcontext():
+            with model_slots:
+                run_traced(item)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(models))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, run_with_backend_slot, item)
+            for item in models
+        ]
+        # Surface the first failure once every model had the chance to finish
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
@@ -1,41 +1,201 @@
+import csv
+import json
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
+
+import numpy as np
 
-from evaluator.data.file_io import read_json_from_file
 from evaluator.models.qa import QACollection
 
+SCORES_FILE = "scores.csv"
+QUESTIONS_FILE = "questions.csv"
 
-def score_model_outputs(ground_truth: QACollection, eval_path: Path) -> Dict[str, float]:
-    qa_set = ground_truth.qa_map
 
-    scores: Dict[str, float] = {}
+@dataclass
+class ScoreMatrix:
+    """Outputs of every model of an eval, one row per model and one column per question."""
+
+    models: List[str]
+    question_numbers: np.ndarray
+    # Normalized (stripped, lower case) answers, "" where the model gave none
+    answers: np.ndarray
+    # The model has an entry for the question
+    answered: np.ndarray
+    # The answer matches the ground truth
+    correct: np.ndarray
+
+
+@dataclass
+class Scores:
+    models: List[str]
+    question_numbers: np.ndarray
+    answered: np.ndarray
+    correct: np.ndarray
+    accuracy: np.ndarray
+    ci_low: np.ndarray
+    ci_high: np.ndarray
+    # Share of the models that got each question wrong
+    difficulty: np.ndarray
+    # Share of the models that gave the most common answer to each question
+    agreement: np.ndarray
+
 
-    for model_file in eval_path.glob("*.json"):
-        model_name = model_file.stem
-        model_collection = read_json_from_file(model_file, QACollection)
-        if not model_collection:
-            print(f"Skipping {model_file} due to load error.")
+def load_score_matrix(ground_truth: QACollection, eval_path: Path) -> ScoreMatrix:
+    question_numbers = np.array(sorted(ground_truth.qa_map), dtype=np.int64)
+    column_of = {int(q_number): i for i, q_number in enumerate(question_numbers)}
+    expected = _normalize(
+        [ground_truth.qa_map[int(q_number)].answer for q_number in question_numbers]
+    )
+
+    models = []
+    rows = []
+    for model_file in sorted(eval_path.glob("*.json")):
+        # Plain JSON is enough here, validating every answer through pydantic is the slow part
+        try:
+            qa_map = json.loads(model_file.read_text(encoding="utf-8"))["qa_map"]
+            row = [None] * len(question_numbers)
+            for q_number, qa in qa_map.items():
+                column = column_of.get(int(q_number))
+                if column is not None:
+                    row[column] = qa.get("answer", "")
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            # Also files with non-integer question numbers or entries that are not objects
+            print(f"Skipping {model_file} due to load error: {e}")
             continue
 
-        model_qa_map = model_collection.qa_map
+        models.append(model_file.stem)
+        rows.append(row)
+
+    shape = (len(models), len(question_numbers))
+    answered = np.array(
+        [answer is not None for row in rows for answer in row], dtype=bool
+    ).reshape(shape)
+    answers = _normalize([answer or "" for row in rows for answer in row]).reshape(shape)
+    correct = answered & (answers == expected[np.newaxis, :])
+
+    return ScoreMatrix(
+        models=models,
+        question_numbers=question_numbers,
+        answers=answers,
+        answered=answered,
+        correct=correct,
+    )
+
+
+def compute_scores(
+    matrix: ScoreMatrix,
+    n_bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = 0,
+) -> Scores:
+    correct = matrix.correct.astype(np.float64)
+    answered = matrix.answered.astype(np.float64)
+    n_models, n_questions = correct.shape
+
+    answered_count = answered.sum(axis=1)
+    accuracy = _ratio(correct.sum(axis=1), answered_count)
+
+    # Bootstrap over questions: every resample is a vector of how often each question was
+    # drawn, so the resampled scores of all models are a single matrix product
+    ci_low = ci_high = accuracy
+    if n_questions and n_bootstrap > 0:
+        rng = np.random.default_rng(seed)
+        draws = rng.multinomial(n_questions, np.full(n_questions, 1 / n_questions), n_bootstrap)
+        resampled = _ratio(draws @ correct.T, draws @ answered.T)
+        alpha = (1 - confidence) / 2
+        ci_low, ci_high = np.quantile(resampled, [alpha, 1 - alpha], axis=0)
+
+    models_answered = answered.sum(axis=0)
+    difficulty = 1 - _ratio(correct.sum(axis=0), models_answered)
+
+    # Count each distinct answer per question, answers are encoded as integers first
+    codes = np.unique(matrix.answers, return_inverse=True)[1].reshape(n_models, n_questions)
+    n_codes = int(codes.max()) + 1 if codes.size else 0
+    flat = (np.arange(n_questions)[np.newaxis, :] * n_codes + codes)[matrix.answered]
+    answer_counts = np.bincount(flat, minlength=n_questions * n_codes)
+    modal_counts = answer_counts.reshape(n_questions, n_codes).max(axis=1, initial=0)
+    agreement = _ratio(modal_counts, models_answered)
+
+    return Scores(
+        models=matrix.models,
+        question_numbers=matrix.question_numbers,
+        answered=matrix.answered,
+        correct=matrix.correct,
+        accuracy=accuracy,
+        ci_low=ci_low,
+        ci_high=ci_high,
+        difficulty=difficulty,
+        agreement=agreement,
+    )
+
+
+def write_scores(scores: Scores, eval_path: Path):
+    """
+    Writes the per-model results table and the per-question matrix as CSV next to the
+    model outputs (which are picked up by their .json suffix).
+    """
+    try:
+        with (eval_path / SCORES_FILE).open("w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["model", "answered", "correct", "accuracy", "ci_low", "ci_high"])
+            for i, model in enumerate(scores.models):
+                writer.writerow(
+                    [
+                        model,
+                        int(scores.answered[i].sum()),
+                        int(scores.correct[i].sum()),
+                        f"{scores.accuracy[i]:.4f}",
+                        f"{scores.ci_low[i]:.4f}",
+                        f"{scores.ci_high[i]:.4f}",
+                    ]
+                )
+
+        # 1 for a correct answer, 0 for a wrong one and empty if the model has no answer
+        cells = np.where(scores.answered, scores.correct.astype(int).astype(str), "")
+        with (eval_path / QUESTIONS_FILE).open("w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["question_number", "difficulty", "agreement", *scores.models])
+            for j, q_number in enumerate(scores.question_numbers):
+                writer.writerow(
+                    [
+                        int(q_number),
+                        f"{scores.difficulty[j]:.4f}",
+                        f"{scores.agreement[j]:.4f}",
+                        *cells[:, j],
+                    ]
+                )
+    except OSError as e:
+        print(f"Error saving scores to {eval_path}: {e}")
+
+
+def score_model_outputs(ground_truth: QACollection, eval_path: Path) -> Dict[str, float]:
+    scores = compute_scores(load_score_matrix(ground_truth, eval_path))
 
-        correct = 0
-        total = 0
+    for i, model_name in enumerate(scores.models):
+        correct = int(scores.correct[i].sum())
+        total = int(scores.answered[i].sum())
+        print(
+            f"{model_name}: {correct}/{total} correct ({scores.accuracy[i]:.2%}, "
+            f"95% CI {scores.ci_low[i]:.2%}-{scores.ci_high[i]:.2%})"
+        )
 
-        for q_number, expected_qa in qa_set.items():
-            if q_number not in model_qa_map:
-                continue
+    if scores.models:
+        write_scores(scores, eval_path)
 
-            predicted_qa = model_qa_map[q_number]
+    return {model: float(accuracy) for model, accuracy in zip(scores.models, scores.accuracy)}
 
-            # Exact match scoring, case-insensitive
-            if predicted_qa.answer.strip().lower() == expected_qa.answer.strip().lower():
-                correct += 1
 
-            total += 1
+def _normalize(answers: List[str]) -> np.ndarray:
+    # Exact match scoring, case-insensitive
+    return np.char.lower(np.char.strip(np.array(answers, dtype=np.str_)))
 
-        accuracy = correct / total if total else 0.0
-        scores[model_name] = accuracy
-        print(f"{model_name}: {correct}/{total} correct ({accuracy:.2%})")
 
-    return scores
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division that yields 0 where the denominator is 0."""
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(np.broadcast(numerator, denominator).shape),
+        where=denominator > 0,
+    )
@@ -1,18 +1,24 @@
+import threading
 from collections import defaultdict
+from contextlib import nullcontext
 from dataclasses import dataclass
 from itertools import islice
 from pathlib import Path
 from typing import Dict, List, Optional
 
-from rich.progress import track
+from rich.progress import Progress
 
 from evaluator.data.file_io import (
+    is_output_complete,
     load_ap_history_qa_set,
     read_json_from_file,
     write_json_to_file,
 )
+from evaluator.data.journal import ResultJournal
 from evaluator.data.vector_search import SearchConfiguration
+from evaluator.evals.scheduling import generate_concurrently, run_models_concurrently
 from evaluator.evals.scoring import score_model_outputs
+from evaluator.instrumentation import tracer
 from evaluator.models.llm import LLMResponse
 from evaluator.models.qa import QA, QACollection, default_qa
 from evaluator.utils import get_data_path, get_normalized_model_name
@@ -65,6 +71,8 @@ class AnswerGeneratorFactory(Protocol):
 class ContextRetriever(Protocol):
     def query(self, query: str) -> Optional[List[str]]: ...
 
+    def query_many(self, queries: List[str]) -> List[Optional[List[str]]]: ...
+
 
 class ContextRetrieverFactory(Protocol):
     def __call__(self, config: SearchConfiguration) -> ContextRetriever: ...
@@ -80,6 +88,9 @@ class VectorRAGEval:
         output_dir: Path,
         strategy: Strategy,
         max_questions: Optional[int] = None,
+        concurrency: int = 1,
+        max_parallel_models: int = 1,
+        backend_limits: Optional[Dict[str, int]] = None,
     ) -> None:
         print(f"Configuring Vector RAG with strategy: {strategy}")
         self.models = models
@@ -91,6 +102,13 @@ class VectorRAGEval:
         # Determine total number of questions to evaluate
         self.max_questions: int = max_questions or len(qa_collection.qa_map)
 
+        # Number of questions kept in flight per model
+        self.concurrency = concurrency
+
+        # Number of models evaluated at the same time, optionally capped per backend
+        self.max_parallel_models = max_parallel_models
+        self.backend_limits = backend_limits or {}
+
         # Dir where the eval outputs will be stored
         self._eval_dir = output_dir / "vector_rag" / strategy.name
 
@@ -121,21 +139,42 @@ class VectorRAGEval:
             /no_think
             """
 
-        self.vector_search = vector_search_factory(strategy.vector_search_config)
+        self._vector_search_factory = vector_search_factory
+        self._vector_search_config = strategy.vector_search_config
+        self._vector_search: Optional[ContextRetriever] = None
+        self._vector_search_lock = threading.Lock()
+
+    @property
+    def vector_search(self) -> ContextRetriever:
+        # Built on first use, so evals whose outputs are complete never load an index
+        with self._vector_search_lock:
+            if self._vector_search is None:
+                self._vector_search = self._vector_search_factory(self._vector_search_config)
+            return self._vector_search
 
     def run_eval(self):
         print(f"Running {self.__class__.__name__}")
-        for model_name in self.models:
-            self._generate_answers(model_name)
+        with Progress() if self.max_parallel_models > 1 else nullcontext() as progress:
+            # Models running in parallel share a single progress display
+            run_models_concurrently(
+                self.models,
+                lambda model_name: self.run_model(model_name, progress),
+                max_parallel_models=self.max_parallel_models,
+                backend_limits=self.backend_limits,
+            )
 
-        self._score()
+        self.score()
 
-    def _generate_answers(self, model_name: str):
+    def run_model(self, model_name: str, progress: Optional[Progress] = None):
+        """
+        Answers the questions `model_name` has not answered yet and saves its output. Given a
+        `progress`, its answer progress is shown there instead of in a display of its own.
+        """
         model_name_str = get_normalized_model_name(model_name)
         print(f"{model_name_str}: Starting evaluation")
 
         # Path for output file
-        output_file = Path(f"{self._eval_dir}/{model_name_str}.json")
+        output_file = self._output_file(model_name)
 
         # Init llm
         gen = self._answer_generator(model_name, self._system_prompt)
@@ -148,33 +187,68 @@ class VectorRAGEval:
                 model_response_set = existing_collection.qa_map
                 print(f"{model_name_str}: Loaded the already existing output")
 
+        # Answers of an interrupted run are recovered from its journal
+        journal = ResultJournal(output_file.with_suffix(".jsonl"))
+        journaled_responses = journal.replay()
+        if journaled_responses:
+            model_response_set.update(journaled_responses)
+            print(
+                f"{model_name_str}: Recovered {len(journaled_responses)} answers from the journal"
+            )
+
         # Capture responses for unanswered questions
         questions_to_answer = [
-            q_number for q_number in islice(self._qa_set, self.max_questions)
-        ]
-
-        for q_number in track(
-            questions_to_answer, description=f"{model_name_str}: Generating answers"
-        ):
-            if (
+            q_number
+            for q_number in islice(self._qa_set, self.max_questions)
+            if not (
                 q_number in model_response_set
                 and model_response_set[q_number].answer != ""
-            ):  # Skip if already answered
-                continue
+            )  # Skip if already answered
+        ]
 
-            qa = self._qa_set[q_number]
-            context_docs = self.vector_search.query(qa.question)
-            response = gen.generate(qa.question, context_docs)
-            model_response_set[q_number] = QA(
-                question="", answer=response.answer.upper()
+        # Prefetch the context of every pending question in one batched retrieval
+        context_by_question: Dict[int, Optional[List[str]]] = {}
+        if questions_to_answer:
+            contexts = self.vector_search.query_many(
+                [self._qa_set[q_number].question for q_number in questions_to_answer]
             )
+            context_by_question = dict(zip(questions_to_answer, contexts))
 
-        # Save updated response set
+        def answer_question(q_number: int) -> LLMResponse:
+            qa = self._qa_set[q_number]
+            return gen.generate(qa.question, context_by_question[q_number])
+
+        with journal:
+            for q_number, response in generate_concurrently(
+                questions_to_answer,
+                answer_question,
+                concurrency=self.concurrency,
+                description=f"{model_name_str}: Generating answers",
+                progress=progress,
+            ):
+                qa = QA(question="", answer=response.answer.upper())
+                model_response_set[q_number] = qa
+                with tracer.stage("result_write"):
+                    journal.append(q_number, qa)
+
+        # Compact the journal into the JSON output
         model_response_collection = QACollection(qa_map=model_response_set)
-        if write_json_to_file(output_file, model_response_collection):
+        with tracer.stage("result_write"):
+            saved = write_json_to_file(output_file, model_response_collection)
+        if saved:
+            journal.discard()
             print(f"{model_name_str}: Eval completed")
 
-    def _score(self):
+    def is_completed(self, model_name: str) -> bool:
+        """Whether the saved output of `model_name` already answers every question."""
+        return is_output_complete(
+            self._output_file(model_name), islice(self._qa_set, self.max_questions)
+        )
+
+    def _output_file(self, model_name: str) -> Path:
+        return Path(f"{self._eval_dir}/{get_normalized_model_name(model_name)}.json")
+
+    def score(self):
         evals = get_data_path(f"{self._eval_dir}")
         ground_truth: QACollection = load_ap_history_qa_set()
         score_model_outputs(ground_truth, evals)
@@ -0,0 +1,206 @@
+import itertools
+import json
+import threading
+import tomllib
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from rich.progress import Progress
+
+from evaluator.data.vector_search import SearchConfiguration
+from evaluator.evals.basic import BasicEval
+from evaluator.evals.scheduling import run_models_concurrently
+from evaluator.evals.vector_rag import (
+    AnswerGeneratorFactory,
+    ContextRetriever,
+    ContextRetrieverFactory,
+    Strategy,
+    VectorRAGEval,
+)
+from evaluator.models.qa import QACollection
+from evaluator.rate_limit import RateLimitConfig
+
+Evaluation = Union[BasicEval, VectorRAGEval]
+
+
+@dataclass
+class ExperimentConfig:
+    models: List[str]
+    # Vector RAG strategies, the basic (no context) eval runs in addition when enabled
+    strategies: List[Strategy] = field(default_factory=list)
+    run_basic: bool = True
+    basic_batch_size: int = 1
+    max_questions: Optional[int] = None
+    # Questions kept in flight per model, the rate limit of the generator still applies
+    answer_concurrency: int = 4
+    # (strategy, model) cells evaluated at the same time across all strategies, each backend
+    # caps how many of its cells run at once
+    max_parallel_cells: int = 6
+    backend_limits: Dict[str, int] = field(default_factory=dict)
+    # Call rate limits overriding the defaults of a backend (a prefix of the model name)
+    rate_limits: Dict[str, RateLimitConfig] = field(default_factory=dict)
+
+
+@dataclass
+class EvalCell:
+    """A single model evaluated under a single strategy."""
+
+    evaluation: Evaluation
+    model: str
+
+
+def load_experiment_config(config_file: Path) -> ExperimentConfig:
+    """
+    Reads an experiment from a TOML file. Besides single `[[strategies]]`, `[[grids]]` expand
+    every list valued `search` setting into one strategy per combination, their `name` is a
+    format string over the settings. `[rate_limits.<backend>]` tables are RateLimitConfig
+    fields.
+    """
+    with config_file.open("rb") as f:
+        config = tomllib.load(f)
+
+    strategies = [
+        Strategy(
+            name=strategy["name"],
+            description=strategy.get("description", ""),
+            vector_search_config=SearchConfiguration(**strategy.get("search", {})),
+        )
+        for strategy in config.pop("strategies", [])
+    ]
+    for grid in config.pop("grids", []):
+        strategies.extend(expand_grid(grid["name"], grid.get("search", {})))
+
+    rate_limits = {
+        backend: RateLimitConfig(**limit)
+        for backend, limit in config.pop("rate_limits", {}).items()
+    }
+
+    return ExperimentConfig(strategies=strategies, rate_limits=rate_limits, **config)
+
+
+def expand_grid(name: str, search: Dict[str, Any]) -> List[Strategy]:
+    axes = {key: value if isinstance(value, list) else [value] for key, value in search.items()}
+    strategies = []
+    for values in itertools.product(*axes.values()):
+        settings = dict(zip(axes, values))
+        strategies.append(
+            Strategy(
+                name=name.format(**settings),
+                description=f"Grid {name}: {settings}",
+                vector_search_config=SearchConfiguration(**settings),
+            )
+        )
+    return strategies
+
+
+class SharedSearchFactory:
+    """
+    Builds one retriever per distinct search configuration, so strategies that only differ
+    downstream of retrieval share the index, the loaded models and the retrieval results.
+    """
+
+    def __init__(self, vector_search_factory: ContextRetrieverFactory) -> None:
+        self._vector_search_factory = vector_search_factory
+        self._searches: Dict[str, ContextRetriever] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, config: SearchConfiguration) -> ContextRetriever:
+        key = json.dumps(asdict(config), sort_keys=True)
+        with self._lock:
+            if key not in self._searches:
+                self._searches[key] = self._vector_search_factory(config)
+            return self._searches[key]
+
+    def __len__(self) -> int:
+        return len(self._searches)
+
+
+class ExperimentRunner:
+    """
+    Runs every (strategy, model) cell of an experiment as a single work graph: duplicate
+    strategies and models are dropped, cells whose outputs are complete are skipped and the
+    remaining cells of all strategies share one scheduler.
+    """
+
+    def __init__(
+        self,
+        config: ExperimentConfig,
+        qa_collection: QACollection,
+        answer_generator: AnswerGeneratorFactory,
+        vector_search_factory: ContextRetrieverFactory,
+        output_dir: Path,
+    ) -> None:
+        self.config = config
+        self.qa_collection = qa_collection
+        self.answer_generator = answer_generator
+        self.search_factory = SharedSearchFactory(vector_search_factory)
+        self.output_dir = output_dir
+
+    def build_evaluations(self) -> List[Evaluation]:
+        models = list(dict.fromkeys(self.config.models))
+        common: Dict[str, Any] = dict(
+            models=models,
+            qa_collection=self.qa_collection,
+            answer_generator=self.answer_generator,
+            output_dir=self.output_dir,
+            max_questions=self.config.max_questions,
+            concurrency=self.config.answer_concurrency,
+        )
+
+        evaluations: List[Evaluation] = []
+        if self.config.run_basic:
+            evaluations.append(BasicEval(batch_size=self.config.basic_batch_size, **common))
+
+        # Config key of every strategy name, and the strategy name of every config key
+        names: Dict[str, str] = {}
+        configs: Dict[str, str] = {}
+        for strategy in self.config.strategies:
+            config_key = json.dumps(asdict(strategy.vector_search_config), sort_keys=True)
+            if strategy.name in names and names[strategy.name] != config_key:
+                # Both would write their outputs to the same directory
+                raise ValueError(
+                    f"Strategy name {strategy.name} is used for different search configurations"
+                )
+            if config_key in configs:
+                print(f"Skipping strategy {strategy.name}, it duplicates {configs[config_key]}")
+                continue
+            names[strategy.name] = config_key
+            configs[config_key] = strategy.name
+            evaluations.append(
+                VectorRAGEval(
+                    vector_search_factory=self.search_factory, strategy=strategy, **common
+                )
+            )
+        return evaluations
+
+    def build_cells(self, evaluations: List[Evaluation]) -> List[EvalCell]:
+        cells = []
+        for evaluation in evaluations:
+            for model in evaluation.models:
+                if evaluation.is_completed(model):
+                    continue
+                cells.append(EvalCell(evaluation=evaluation, model=model))
+        return cells
+
+    def run(self):
+        evaluations = self.build_evaluations()
+        cells = self.build_cells(evaluations)
+        total = sum(len(evaluation.models) for evaluation in evaluations)
+        print(f"Running {len(cells)} of {total} eval cells, the others are complete")
+
+        parallel = self.config.max_parallel_cells > 1
+        with Progress() if parallel else nullcontext() as progress:
+            # Cells running in parallel share a single progress display
+            run_models_concurrently(
+                cells,
+                lambda cell: cell.evaluation.run_model(cell.model, progress),
+                max_parallel_models=self.config.max_parallel_cells,
+                backend_limits=self.config.backend_limits,
+                model_of=lambda cell: cell.model,
+            )
+
+        print(f"Built {len(self.search_factory)} vector searches")
+        for evaluation in evaluations:
+            evaluation.score()
@@ -0,0 +1,180 @@
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+# Upper bounds (ms) of the latency histogram buckets, the last bucket is unbounded
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+_HISTOGRAM_LABELS = [f"<={bound}ms" for bound in HISTOGRAM_BUCKETS_MS] + [
+    f">{HISTOGRAM_BUCKETS_MS[-1]}ms"
+]
+
+# Model the current (possibly worker) thread is evaluating, propagated with contextvars
+_current_model: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_model", default="-"
+)
+
+
+@dataclass
+class Span:
+    stage: str
+    model: str
+    start_s: float
+    duration_s: float
+    thread_id: int
+    # Questions handled by the span, batched stages are attributed evenly to each of them
+    items: int = 1
+
+
+class Tracer:
+    """
+    Records the wall time of the eval hot path stages (embedding, lookup, reranking,
+    prompt building, completion, validation, writing) per model.
+    Recording is a no-op until the tracer is enabled. Latency statistics are per question:
+    a stage run once for a batch of questions counts as one equal share per question.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._origin_s = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._spans = []
+            self._origin_s = time.perf_counter()
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    @contextmanager
+    def model(self, model_name: str) -> Iterator[None]:
+        """Attributes the stages recorded in this context to `model_name`."""
+        token = _current_model.set(model_name)
+        try:
+            yield
+        finally:
+            _current_model.reset(token)
+
+    @contextmanager
+    def stage(self, stage: str, items: int = 1) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        start_s = time.perf_counter()
+        try:
+            yield
+        finally:
+            span = Span(
+                stage=stage,
+                model=_current_model.get(),
+                start_s=start_s,
+                duration_s=time.perf_counter() - start_s,
+                thread_id=threading.get_ident(),
+                items=max(1, items),
+            )
+            with self._lock:
+                self._spans.append(span)
+
+    def summary(self) -> Dict[str, Dict[str, Dict]]:
+        """Per question latency statistics and histogram per model and stage."""
+        durations: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+        for span in self.spans:
+            # Every question of a batched span gets an equal share of its time
+            share_ms = span.duration_s * 1000 / span.items
+            durations[span.model][span.stage].extend([share_ms] * span.items)
+
+        summary: Dict[str, Dict[str, Dict]] = {}
+        for model, stages in durations.items():
+            summary[model] = {}
+            for stage, stage_durations in stages.items():
+                durations_ms = np.asarray(stage_durations)
+                bucket_counts = np.bincount(
+                    np.searchsorted(HISTOGRAM_BUCKETS_MS, durations_ms),
+                    minlength=len(HISTOGRAM_BUCKETS_MS) + 1,
+                )
+                summary[model][stage] = {
+                    "count": int(durations_ms.size),
+                    "total_ms": float(durations_ms.sum()),
+                    "mean_ms": float(durations_ms.mean()),
+                    "p50_ms": float(np.percentile(durations_ms, 50)),
+                    "p90_ms": float(np.percentile(durations_ms, 90)),
+                    "p99_ms": float(np.percentile(durations_ms, 99)),
+                    "max_ms": float(durations_ms.max()),
+                    "histogram": dict(zip(_HISTOGRAM_LABELS, bucket_counts.tolist())),
+                }
+        return summary
+
+    def export(self, trace_file: Path) -> bool:
+        """
+        Writes the recorded spans in the Chrome trace event format (viewable in Perfetto or
+        chrome://tracing) together with the per-model summary.
+        """
+        trace_events = [
+            {
+                "name": span.stage,
+                "cat": span.model,
+                "ph": "X",
+                "ts": (span.start_s - self._origin_s) * 1e6,
+                "dur": span.duration_s * 1e6,
+                "pid": 0,
+                "tid": span.thread_id,
+                "args": {"model": span.model, "items": span.items},
+            }
+            for span in self.spans
+        ]
+        trace_file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            trace_file.write_text(
+                json.dumps({"traceEvents": trace_events, "summary": self.summary()}),
+                encoding="utf-8",
+            )
+            return True
+        except OSError as e:
+            print(f"Error saving trace to {trace_file}: {e}")
+            return False
+
+    def render_summary(self, console: Optional[Console] = None):
+        table = Table(
+            title="Time spent per stage",
+            caption="Count and latencies are per question, batched stages are split evenly",
+        )
+        for column in ["Model", "Stage", "Count", "Total (s)", "Mean (ms)", "p50 (ms)", "p99 (ms)"]:
+            table.add_column(column, justify="left" if column in ("Model", "Stage") else "right")
+
+        for model, stages in sorted(self.summary().items()):
+            for stage, stats in sorted(stages.items(), key=lambda item: -item[1]["total_ms"]):
+                table.add_row(
+                    model,
+                    stage,
+                    str(stats["count"]),
+                    f"{stats['total_ms'] / 1000:.2f}",
+                    f"{stats['mean_ms']:.1f}",
+                    f"{stats['p50_ms']:.1f}",
+                    f"{stats['p99_ms']:.1f}",
+                )
+
+        (console or Console()).print(table)
+
+
+# Process-wide tracer used by the eval hot paths
+tracer = Tracer()
@@ -1,50 +1,120 @@
-from typing import Optional
+from typing import Dict, Optional, Tuple, Type, TypeVar
 
 from litellm import CustomStreamWrapper, completion
+from litellm.exceptions import RateLimitError, Timeout
 from litellm.types.utils import StreamingChoices
-from ratelimit import limits, sleep_and_retry  # type: ignore
+from pydantic import BaseModel
 
-from evaluator.models.llm import LLMResponse
+from evaluator.instrumentation import tracer
+from evaluator.llm_cache import ResponseCache, response_cache_key
+from evaluator.models.llm import BatchLLMResponse, LLMResponse
+from evaluator.rate_limit import TokenBucket, get_rate_limiter
+
+R = TypeVar("R", bound=BaseModel)
 
 
 class LLMAnswerGenerator:
+    # Errors signalling the backend is overloaded, the call is retried after backing off
+    throttling_errors: Tuple[Type[Exception], ...] = (RateLimitError, Timeout)
+
     def __init__(
         self,
         model_name: str,
         system_prompt: str,
         temperature: float = 0.0,
+        response_cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries: int = 5,
     ):
         self.model_name = model_name
         self.system_prompt = system_prompt
         self.temperature = temperature
-
-        calls, period = self._get_llm_rate_limits()
-        # Dynamically apply the rate limit decorator to the instance's generate method
-
-        self.generate = sleep_and_retry(  # type: ignore [method-assign]
-            limits(calls=calls, period=period)(self.generate)
-        )
-
-    def _get_llm_rate_limits(self) -> tuple:
-        # Determine rate limit parameters based on the model name
-        if self.model_name.startswith("gemini"):
-            calls, period = 8, 60
-        elif self.model_name.startswith("openai") or self.model_name.startswith("gpt"):
-            calls, period = 8, 60
-        else:
-            calls, period = 90, 60
-        return (calls, period)
+        self.response_cache = response_cache
+        # Generators calling the same backend share a limiter unless one is given explicitly
+        self.rate_limiter = rate_limiter or get_rate_limiter(model_name)
+        self.max_retries = max_retries
 
     def generate(self, question: str, context: Optional[list] = None) -> LLMResponse:
         if context:
-            question = self.generate_prompt(question, context)
+            with tracer.stage("prompt_build"):
+                question = self.generate_prompt(question, context)
+
+        return self._generate(question, LLMResponse)
 
+    def generate_batch(self, questions: Dict[int, str]) -> Dict[int, LLMResponse]:
+        """
+        Answers several questions, keyed by question number, with a single completion.
+        Questions the batch response leaves unanswered, or all of them if the response is
+        malformed, are answered one by one instead.
+        """
+        with tracer.stage("prompt_build", items=len(questions)):
+            prompt = self.generate_batch_prompt(questions)
+
+        responses: Dict[int, LLMResponse] = {}
+        try:
+            batch = self._generate(prompt, BatchLLMResponse)
+            for batch_answer in batch.answers:
+                if batch_answer.question_number in questions and batch_answer.answer.strip():
+                    responses[batch_answer.question_number] = LLMResponse(
+                        answer=batch_answer.answer
+                    )
+        except ValueError as e:
+            print(f"{self.model_name}: Malformed batch response, answering one by one: {e}")
+
+        for q_number, question in questions.items():
+            if q_number not in responses:
+                responses[q_number] = self.generate(question)
+
+        return responses
+
+    def _generate(self, user_prompt: str, response_format: Type[R]) -> R:
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = response_cache_key(
+                self.model_name, self.system_prompt, user_prompt, self.temperature, response_format
+            )
+            cached_content = self.response_cache.get(cache_key)
+            if cached_content is not None:
+                with tracer.stage("json_validation"):
+                    return response_format.model_validate_json(cached_content)
+
+        content = self._complete(user_prompt, response_format)
+
+        with tracer.stage("json_validation"):
+            response = response_format.model_validate_json(content)
+
+        # Only responses that passed validation are cached
+        if self.response_cache is not None and cache_key is not None:
+            self.response_cache.put(cache_key, content)
+
+        return response
+
+    def _complete(self, user_prompt: str, response_format: Type[BaseModel] = LLMResponse) -> str:
+        # Responses served from the cache never get here, so they don't count against the limit
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                with tracer.stage("llm_completion"):
+                    content = self._request(user_prompt, response_format)
+            except self.throttling_errors as e:
+                self.rate_limiter.on_throttled(_get_retry_after(e))
+                if attempt == self.max_retries:
+                    raise
+                attempt += 1
+                print(f"{self.model_name} was throttled, retrying ({attempt}/{self.max_retries})")
+                continue
+
+            self.rate_limiter.on_success()
+            return content
+
+    def _request(self, user_prompt: str, response_format: Type[BaseModel]) -> str:
         response = completion(
             model=self.model_name,
-            response_format=LLMResponse,
+            response_format=response_format,
             messages=[
                 {"content": self.system_prompt, "role": "system"},
-                {"content": question, "role": "user"},
+                {"content": user_prompt, "role": "user"},
             ],
             temperature=self.temperature,
         )
@@ -59,7 +129,7 @@ class LLMAnswerGenerator:
         if content is None:
             raise ValueError("LLM response content is None")
 
-        return LLMResponse.model_validate_json(content)
+        return content
 
     def generate_prompt(self, question_with_options: str, context_docs: list) -> str:
         formatted_context = "\n".join([f"[{i + 1}] {doc}" for i, doc in enumerate(context_docs)])
@@ -72,3 +142,26 @@ class LLMAnswerGenerator:
         {question_with_options}
         """
         return prompt.strip()
+
+    def generate_batch_prompt(self, questions: Dict[int, str]) -> str:
+        formatted_questions = "\n\n".join(
+            f"Question {q_number}:\n{question.strip()}" for q_number, question in questions.items()
+        )
+
+        prompt = f"""
+        Answer each of the following questions. Respond with one entry per question holding
+        its question number and your answer.
+
+        {formatted_questions}
+        """
+        return prompt.strip()
+
+
+def _get_retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait, if it sent a Retry-After header."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        return float(headers["retry-after"])
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Type
+
+from pydantic import BaseModel
+
+
+def response_cache_key(
+    model_name: str,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    response_format: Type[BaseModel],
+) -> str:
+    """
+    Content address of a completion request, any change to the inputs yields a new key.
+    """
+    request = {
+        "model": model_name,
+        "system_prompt": system_prompt,
+        "user_prompt": user_prompt,
+        "temperature": temperature,
+        "response_format": response_format.model_json_schema(),
+    }
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite backed store of raw LLM response contents keyed by `response_cache_key`.
+    Once the stored contents exceed `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, db_file: Path, max_bytes: int = 256 * 2**20) -> None:
+        self.db_file = db_file
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(db_file), check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT content FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            return row[0]
+
+    def put(self, key: str, content: str):
+        size = len(content.encode("utf-8"))
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, content, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, content, size, time.time()),
+            )
+            self._evict()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _total_bytes(self) -> int:
+        return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self):
+        excess = self._total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+
+        # Drop the least recently used entries until the store fits again
+        freed = 0
+        evicted_keys = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ):
+            evicted_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
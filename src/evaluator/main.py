@@ -1,84 +1,94 @@
+import argparse
+import os
+import time
+
 from dotenv import load_dotenv
 
-import evaluator.data.file_io as data
-from evaluator.evals import basic, vector_rag
+import evaluator.data.ingestion as ingestion
 
 from evaluator.data.file_io import (
     load_ap_history_qa_set,
 )
 
-from evaluator.utils import get_data_path
+from evaluator.utils import find_project_root, get_data_path
+from evaluator.instrumentation import tracer
 from evaluator.llm import LLMAnswerGenerator
-from evaluator.models.qa import QACollection
-from evaluator.data.vector_search import SearchConfiguration, VectorSearch
+from evaluator.llm_cache import ResponseCache
+from evaluator.ollama import OllamaAnswerGenerator, OllamaClientPool
+from evaluator.rate_limit import configure_rate_limits
 
 load_dotenv()
 
 
 def pre_process_data():
-    data.process_ap_history_data()
-    data.process_ap_history_solution_guide()
+    parser = argparse.ArgumentParser(description="Ingests the raw PDFs into data/processed")
+    parser.add_argument(
+        "--precompute-embeddings",
+        action="store_true",
+        help="Also embed the chunks of every chunking variant for the vector search",
+    )
+    parser.add_argument(
+        "--embedding-model", help="Defaults to the embedding model of the vector search"
+    )
+    args = parser.parse_args()
+
+    embedding_config = None
+    if args.precompute_embeddings:
+        # The embedding stack is slow to import, ingestion alone does not need it
+        from evaluator.data.vector_search import SearchConfiguration
+
+        settings = {"embedding_model": args.embedding_model} if args.embedding_model else {}
+        embedding_config = SearchConfiguration(**settings)
+    ingestion.ingest_sources(embedding_config=embedding_config)
 
 
 def main():
+    from evaluator.data.vector_search import SearchConfiguration, create_context_retriever
+    from evaluator.experiments import ExperimentRunner, load_experiment_config
+
     print("Running knowledge evaluations...")
-    model_list = [
-        "ollama/granite3.3:2b",
-        "ollama/phi4-mini:3.8b",
-        "ollama/qwen3:4b",
-        "ollama/gemma3:1b",
-        "ollama/gemma3:4b",
-        "ollama/qwen3:1.7b",
-    ]
-
-    def llm_answer_generator(model_name, system_prompt):
-        return LLMAnswerGenerator(model_name, system_prompt)
-
-    evals_root = get_data_path("evals")
-
-    qa_collection: QACollection = load_ap_history_qa_set()
-
-    basic_evaluator = basic.BasicEval(
-        models=model_list,
-        qa_collection=qa_collection,
-        answer_generator=llm_answer_generator,
-        output_dir=evals_root,
-    )
-    basic_evaluator.run_eval()
+    tracer.enable()
+    # Models, strategies and scheduling limits of the run
+    experiment = load_experiment_config(find_project_root() / "experiments.toml")
+    configure_rate_limits(experiment.rate_limits)
 
-    def vector_search_factory(config: SearchConfiguration):
-        return VectorSearch(config)
-
-    vector_rag_evaluator = vector_rag.VectorRAGEval(
-        models=model_list,
-        qa_collection=qa_collection,
-        answer_generator=llm_answer_generator,
-        output_dir=evals_root,
-        vector_search_factory=vector_search_factory,
-        strategy=vector_rag.strategy_baseline,
-    )
-    vector_rag_evaluator.run_eval()
-
-    vector_rag_evaluator = vector_rag.VectorRAGEval(
-        models=model_list,
-        qa_collection=qa_collection,
-        answer_generator=llm_answer_generator,
-        output_dir=evals_root,
-        vector_search_factory=vector_search_factory,
-        strategy=vector_rag.strategy_with_reranking,
-    )
-    vector_rag_evaluator.run_eval()
-
-    vector_rag_evaluator = vector_rag.VectorRAGEval(
-        models=model_list,
-        qa_collection=qa_collection,
-        answer_generator=llm_answer_generator,
-        output_dir=evals_root,
-        vector_search_factory=vector_search_factory,
-        strategy=vector_rag.strategy_with_reranking_with_basic_chunking,
-    )
-    vector_rag_evaluator.run_eval()
+    # Completions are deterministic (temperature 0), so identical prompts are answered from
+    # the cache and only new prompts reach the LLM
+    response_cache = ResponseCache(get_data_path("cache/llm_responses.sqlite"))
+
+    # Local models share one keep-alive connection pool, OLLAMA_API_BASES may list several
+    # comma separated servers to spread the requests over
+    ollama_base_urls = [url for url in os.getenv("OLLAMA_API_BASES", "").split(",") if url]
 
+    def vector_search_factory(config: SearchConfiguration):
+        return create_context_retriever(config)
+
+    try:
+        with OllamaClientPool(ollama_base_urls) as ollama_pool:
+
+            def llm_answer_generator(model_name, system_prompt):
+                if model_name.startswith("ollama/"):
+                    return OllamaAnswerGenerator(
+                        model_name, system_prompt, ollama_pool, response_cache=response_cache
+                    )
+                return LLMAnswerGenerator(
+                    model_name, system_prompt, response_cache=response_cache
+                )
+
+            runner = ExperimentRunner(
+                config=experiment,
+                qa_collection=load_ap_history_qa_set(),
+                answer_generator=llm_answer_generator,
+                vector_search_factory=vector_search_factory,
+                output_dir=get_data_path("evals"),
+            )
+            runner.run()
+    finally:
+        # Report where the run spent its time, also when it failed or was interrupted
+        tracer.render_summary()
+        trace_file = get_data_path(f"traces/eval_{time.strftime('%Y%m%d-%H%M%S')}.json")
+        if tracer.export(trace_file):
+            print(f"Trace written to {trace_file}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,23 @@
+from typing import Dict, List
+
+from pydantic import BaseModel, Field
+
+
+class IngestedQA(BaseModel):
+    q_number: int = Field(..., description="The number of the question in the QA set")
+    pages_sha256: str = Field(..., description="Hash of the question and answer pages")
+    question: str = Field(..., description="The text of the question")
+    answer: str = Field(..., description="The answer to the question")
+
+
+class IngestedSource(BaseModel):
+    file_sha256: str = Field(..., description="Hash of the source PDF")
+    questions: List[IngestedQA] = Field(default_factory=list, description="In page order")
+    chunking_variants: Dict[str, str] = Field(
+        default_factory=dict, description="Fingerprint of the settings of each written variant"
+    )
+
+
+class IngestionManifest(BaseModel):
+    # Keyed by the source path relative to the data directory
+    sources: Dict[str, IngestedSource] = Field(default_factory=dict)
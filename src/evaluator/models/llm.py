@@ -1,5 +1,16 @@
+from typing import List
+
 from pydantic import BaseModel, Field
 
 
 class LLMResponse(BaseModel):
     answer: str = Field(..., description="The answer to the question")
+
+
+class BatchAnswer(BaseModel):
+    question_number: int = Field(..., description="The number of the answered question")
+    answer: str = Field(..., description="The answer to the question")
+
+
+class BatchLLMResponse(BaseModel):
+    answers: List[BatchAnswer] = Field(..., description="One answer per question")
@@ -0,0 +1,106 @@
+import itertools
+import os
+import threading
+from typing import List, Optional, Type
+
+import httpx
+from pydantic import BaseModel
+
+from evaluator.llm import LLMAnswerGenerator
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+
+class OllamaOverloadedError(Exception):
+    """The Ollama server answered 429/503, i.e. it has no capacity for another request."""
+
+    def __init__(self, response: httpx.Response) -> None:
+        super().__init__(f"Ollama server {response.url} returned {response.status_code}")
+        self.response = response
+
+
+class OllamaClientPool:
+    """
+    Keep-alive HTTP connection pool to one or more Ollama servers. Requests are spread over
+    the servers round-robin, the connections are reused across requests and threads.
+    """
+
+    def __init__(
+        self,
+        base_urls: Optional[List[str]] = None,
+        max_connections: int = 16,
+        keepalive_expiry_s: float = 300.0,
+        timeout_s: float = 600.0,
+    ) -> None:
+        if not base_urls:
+            base_urls = [os.getenv("OLLAMA_API_BASE", DEFAULT_OLLAMA_URL)]
+        self.base_urls = [url.rstrip("/") for url in base_urls]
+        self._next_url = itertools.cycle(self.base_urls)
+        self._lock = threading.Lock()
+        self.client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry_s,
+            ),
+            # Generation can take minutes on small machines, only connecting should fail fast
+            timeout=httpx.Timeout(timeout_s, connect=10.0),
+        )
+
+    def next_base_url(self) -> str:
+        with self._lock:
+            return next(self._next_url)
+
+    def post(self, path: str, payload: dict) -> httpx.Response:
+        return self.client.post(f"{self.next_base_url()}{path}", json=payload)
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self) -> "OllamaClientPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class OllamaAnswerGenerator(LLMAnswerGenerator):
+    """
+    Answers through the Ollama chat API over a shared `OllamaClientPool` instead of litellm,
+    so every completion reuses an open connection rather than paying for a new handshake.
+    """
+
+    throttling_errors = LLMAnswerGenerator.throttling_errors + (
+        OllamaOverloadedError,
+        httpx.TimeoutException,
+    )
+
+    def __init__(self, model_name: str, system_prompt: str, client_pool: OllamaClientPool, **kwargs):
+        super().__init__(model_name, system_prompt, **kwargs)
+        self.client_pool = client_pool
+        # The litellm provider prefix is not part of the Ollama model name
+        self.ollama_model = model_name.split("/", 1)[1] if "/" in model_name else model_name
+
+    def _request(self, user_prompt: str, response_format: Type[BaseModel]) -> str:
+        response = self.client_pool.post(
+            "/api/chat",
+            {
+                "model": self.ollama_model,
+                "messages": [
+                    {"content": self.system_prompt, "role": "system"},
+                    {"content": user_prompt, "role": "user"},
+                ],
+                "format": response_format.model_json_schema(),
+                "options": {"temperature": self.temperature},
+                "stream": False,
+            },
+        )
+        if response.status_code in (429, 503):
+            raise OllamaOverloadedError(response)
+        response.raise_for_status()
+
+        content = response.json().get("message", {}).get("content")
+        if content is None:
+            raise ValueError("LLM response content is None")
+
+        return content
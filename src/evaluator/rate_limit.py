@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from evaluator.utils import get_model_backend
+
+
+@dataclass
+class RateLimitConfig:
+    calls_per_minute: float
+    # Number of calls that may be made back to back after an idle period
+    burst: int = 1
+    # Fraction of calls_per_minute the limiter may back off to after repeated throttling
+    min_rate_fraction: float = 0.1
+    # Multiplier applied to the rate when the provider throttles a call
+    backoff_factor: float = 0.5
+    # Fraction of calls_per_minute the rate recovers by after each successful call
+    recovery_fraction: float = 0.05
+    # Give every model of the backend its own limiter instead of one shared by all of them
+    per_model: bool = False
+
+
+# Limits per backend, matched as a prefix of the litellm model name
+DEFAULT_RATE_LIMITS: Dict[str, RateLimitConfig] = {
+    "gemini": RateLimitConfig(calls_per_minute=8),
+    "openai": RateLimitConfig(calls_per_minute=8),
+    "gpt": RateLimitConfig(calls_per_minute=8),
+    # A local server is bound by how many requests it runs at once, which the eval
+    # concurrency caps, the limit only guards against runaway retries
+    "ollama": RateLimitConfig(calls_per_minute=600, burst=8, per_model=True),
+}
+DEFAULT_RATE_LIMIT = RateLimitConfig(calls_per_minute=90, burst=4)
+
+
+class TokenBucket:
+    """
+    Thread and asyncio safe token bucket. Tokens refill continuously at the current rate up
+    to `burst`, every call consumes one token.
+
+    The rate adapts to the provider: a throttled call (429/timeout) multiplies it by
+    `backoff_factor` and pauses the bucket, successful calls raise it back towards the
+    configured limit.
+    """
+
+    def __init__(
+        self,
+        config: RateLimitConfig,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.config = config
+        self.max_rate = config.calls_per_minute / 60
+        self.min_rate = self.max_rate * config.min_rate_fraction
+        self.rate = self.max_rate
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(config.burst)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a call may be made."""
+        while (wait_s := self._try_acquire()) > 0:
+            self._sleep(wait_s)
+
+    async def acquire_async(self):
+        """Waits without blocking the event loop until a call may be made."""
+        while (wait_s := self._try_acquire()) > 0:
+            await asyncio.sleep(wait_s)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(
+                self.max_rate, self.rate + self.max_rate * self.config.recovery_fraction
+            )
+
+    def on_throttled(self, retry_after_s: Optional[float] = None):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.config.backoff_factor)
+            # Drain the bucket and hold every caller back until the provider is ready again
+            self._tokens = 0.0
+            pause_s = retry_after_s if retry_after_s is not None else 1 / self.rate
+            self._paused_until = max(self._paused_until, self._clock() + pause_s)
+
+    def _try_acquire(self) -> float:
+        """Takes a token and returns 0, or returns how long to wait before retrying."""
+        with self._lock:
+            now = self._clock()
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def _refill(self):
+        now = self._clock()
+        start = max(self._updated_at, self._paused_until)
+        if now > start:
+            self._tokens = min(float(self.config.burst), self._tokens + (now - start) * self.rate)
+        self._updated_at = now
+
+
+_rate_limiters: Dict[str, TokenBucket] = {}
+_rate_limits: Dict[str, RateLimitConfig] = dict(DEFAULT_RATE_LIMITS)
+_lock = threading.Lock()
+
+
+def configure_rate_limits(rate_limits: Dict[str, RateLimitConfig]):
+    """
+    Overrides the limits of the given backends. Limiters already handed out keep their
+    configuration, so this should be called before the first generator is created.
+    """
+    with _lock:
+        _rate_limits.update(rate_limits)
+
+
+def get_rate_limiter(model_name: str) -> TokenBucket:
+    """
+    Returns the limiter shared by every generator calling the same backend as `model_name`,
+    or the same model if its backend is limited per model.
+    """
+    with _lock:
+        backend = next(
+            (prefix for prefix in _rate_limits if model_name.startswith(prefix)),
+            get_model_backend(model_name),
+        )
+        config = _rate_limits.get(backend, DEFAULT_RATE_LIMIT)
+        key = model_name if config.per_model else backend
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = TokenBucket(config)
+            _rate_limiters[key] = limiter
+        return limiter
@@ -1,3 +1,4 @@
+import hashlib
 from pathlib import Path
 
 
@@ -26,3 +27,21 @@ def get_data_path(filename: str) -> Path:
 
 def get_normalized_model_name(model_name: str) -> str:
     return model_name.split("/")[-1]
+
+
+def get_model_backend(model_name: str) -> str:
+    """
+    Returns the provider prefix of a litellm model name, e.g. 'ollama' for 'ollama/qwen3:4b'.
+    """
+    return model_name.split("/")[0] if "/" in model_name else "default"
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    Returns the hex sha256 digest of a file's content, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while block := f.read(chunk_size):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,227 @@
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+from unittest.mock import patch
+
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from evaluator.data import ingestion, vector_search
+from evaluator.data.chunking import (
+    DEFAULT_CHUNKING_VARIANTS,
+    ChunkingVariant,
+    write_chunk_variants,
+)
+from evaluator.data.file_io import read_concept_chunks
+from evaluator.data.vector_search import SearchConfiguration
+from evaluator.models.ingestion import IngestionManifest
+from evaluator.models.qa import QACollection
+
+
+def write_pdf(pdf_file: Path, pages: List[str]):
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for text in pages:
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+        )
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+    writer.write(pdf_file)
+
+
+def qa_pages(questions: List[str]) -> List[str]:
+    pages = ["Cover"]
+    for i, question in enumerate(questions):
+        pages += [question, f"Answer: {'ABCD'[i % 4]}"]
+    return pages
+
+
+def ingest(manifest: IngestionManifest, pdf_files: dict) -> QACollection:
+    file_hashes = {source: ingestion.file_sha256(pdf_file) for source, pdf_file in pdf_files.items()}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        ingestion.update_qa_sources(executor, manifest, pdf_files, file_hashes, pages_per_task=3)
+    return ingestion.build_qa_collection(manifest, list(pdf_files))
+
+
+def questions_of(qa_collection: QACollection) -> dict:
+    return {q_number: qa.question for q_number, qa in qa_collection.qa_map.items()}
+
+
+def test_questions_keep_their_numbers_across_ingestions(tmp_path: Path):
+    first, second = tmp_path / "first.pdf", tmp_path / "second.pdf"
+    write_pdf(first, qa_pages(["Q0", "Q1", "Q2"]))
+    # The last question has no answer page
+    write_pdf(second, qa_pages(["Q3", "Q4"]) + ["Q5"])
+    manifest = IngestionManifest()
+
+    qa_collection = ingest(manifest, {"first": first, "second": second})
+    assert questions_of(qa_collection) == {i: f"Q{i}" for i in range(6)}
+    assert [qa.answer for qa in qa_collection.qa_map.values()] == list("ABCAB") + [""]
+
+    # Q1 is edited in place and a question is added
+    write_pdf(first, qa_pages(["Q0", "Q1 edited", "Q2", "Q6"]))
+    with patch.object(
+        ingestion, "extract_qa_pages", wraps=ingestion.extract_qa_pages
+    ) as mock_extract:
+        ingest(manifest, {"first": first})
+
+    assert questions_of(ingestion.build_qa_collection(manifest, ["first", "second"])) == {
+        0: "Q0",
+        1: "Q1 edited",
+        2: "Q2",
+        3: "Q3",
+        4: "Q4",
+        5: "Q5",
+        6: "Q6",
+    }
+    # Only the changed and the new question were extracted again
+    assert [call.args[1:] for call in mock_extract.call_args_list] == [(3, 5), (7, 9)]
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(ingestion, "get_data_path", lambda filename: tmp_path / filename)
+    monkeypatch.setattr(ingestion, "QA_PDFS", ["raw/qa.pdf"])
+    monkeypatch.setattr(ingestion, "cached_guide_elements", lambda *args: iter([]))
+    (tmp_path / "raw").mkdir()
+    write_pdf(tmp_path / "raw" / "qa.pdf", qa_pages(["Q0", "Q1"]))
+    write_pdf(tmp_path / "raw" / "ap_history_guide.pdf", ["Guide"])
+    return tmp_path
+
+
+def test_unchanged_sources_are_skipped(data_dir: Path):
+    ingestion.ingest_sources(max_workers=1)
+    qa_output = data_dir / ingestion.QA_OUTPUT
+    assert qa_output.exists() and (data_dir / ingestion.MANIFEST_FILE).exists()
+    for variant in DEFAULT_CHUNKING_VARIANTS:
+        assert (data_dir / variant.output).exists()
+
+    with patch.object(ingestion, "ProcessPoolExecutor") as mock_executor:
+        ingestion.ingest_sources(max_workers=1)
+        mock_executor.assert_not_called()
+
+    # A deleted output is restored from the manifest without extracting anything
+    qa_output.unlink()
+    with patch.object(ingestion, "extract_qa_pages") as mock_extract:
+        ingestion.ingest_sources(max_workers=1)
+        mock_extract.assert_not_called()
+    assert QACollection.model_validate_json(qa_output.read_text()).qa_map[1].question == "Q1"
+
+
+def fake_chunk(variant, elements, include_orig_elements=False):
+    """
+    Packs whole elements into chunks up to the soft-max, like the basic strategy. Elements
+    over the hard-max are split into chunks of their own that all reference the element.
+    """
+    chunks, current = [], []
+
+    def close():
+        if current:
+            chunks.append((" ".join(e.text for e in current), list(current)))
+            current.clear()
+
+    for element in elements:
+        if len(element.text) > variant.max_characters:
+            close()
+            for start in range(0, len(element.text), variant.max_characters):
+                chunks.append((element.text[start : start + variant.max_characters], [element]))
+            continue
+        if current and len(" ".join(e.text for e in current)) >= variant.new_after_n_chars:
+            close()
+        current.append(element)
+    close()
+    return [
+        SimpleNamespace(text=text, metadata=SimpleNamespace(orig_elements=orig_elements))
+        for text, orig_elements in chunks
+    ]
+
+
+def test_variants_are_chunked_in_one_streaming_pass(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(ChunkingVariant, "chunk", fake_chunk)
+    elements = [SimpleNamespace(text=f"element {i} " + "x" * (i % 7)) for i in range(60)]
+    batches = (elements[i : i + 7] for i in range(0, len(elements), 7))
+    variants = [
+        ChunkingVariant(name="small", new_after_n_chars=40),
+        ChunkingVariant(name="large", new_after_n_chars=120),
+    ]
+    output_files = [tmp_path / "small.jsonl", tmp_path / "large.jsonl"]
+
+    counts = write_chunk_variants(batches, variants, output_files)
+
+    # Streaming yields the chunks of chunking the whole document at once
+    for variant, output_file in zip(variants, output_files):
+        whole = [chunk.text for chunk in fake_chunk(variant, elements)]
+        assert counts[variant.name] == len(whole)
+        chunks = read_concept_chunks(output_file)
+        assert chunks is not None
+        assert list(chunks.values()) == whole
+    assert counts["small"] > counts["large"]
+
+
+def test_oversized_element_at_a_batch_boundary_is_chunked_once(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(ChunkingVariant, "chunk", fake_chunk)
+    # The last split of the oversized element is a short chunk ending the first batch
+    elements = [SimpleNamespace(text=f"element {i}") for i in range(3)]
+    elements.append(SimpleNamespace(text="y" * 2600))
+    elements.extend(SimpleNamespace(text=f"element {i}") for i in range(4, 8))
+    variant = ChunkingVariant(name="small", max_characters=1000, new_after_n_chars=800)
+    output_file = tmp_path / "small.jsonl"
+
+    write_chunk_variants(iter([elements[:4], elements[4:]]), [variant], [output_file])
+
+    whole = [chunk.text for chunk in fake_chunk(variant, elements)]
+    chunks = read_concept_chunks(output_file)
+    assert chunks is not None
+    assert list(chunks.values()) == whole
+
+
+def test_changed_chunking_variants_are_chunked_again(data_dir: Path):
+    ingestion.ingest_sources(max_workers=1)
+
+    variants = [*DEFAULT_CHUNKING_VARIANTS, ChunkingVariant(name="wide", max_characters=2000)]
+    with patch.object(
+        ingestion, "write_chunk_variants", wraps=ingestion.write_chunk_variants
+    ) as mock_write:
+        ingestion.ingest_sources(max_workers=1, chunking_variants=variants)
+
+    assert [variant.name for variant in mock_write.call_args.args[1]] == ["wide"]
+
+
+def test_embeddings_are_precomputed_when_requested(data_dir: Path):
+    with patch.object(vector_search, "precompute_embeddings") as mock_precompute:
+        ingestion.ingest_sources(max_workers=1)
+        mock_precompute.assert_not_called()
+
+        embedding_config = SearchConfiguration(embedding_model="test-model")
+        # Also for sources that are already ingested
+        ingestion.ingest_sources(max_workers=1, embedding_config=embedding_config)
+
+    configs = [call.args[0] for call in mock_precompute.call_args_list]
+    assert [config.chunking_style for config in configs] == [
+        variant.name for variant in DEFAULT_CHUNKING_VARIANTS
+    ]
+    assert all(config.embedding_model == "test-model" for config in configs)
+
+
+def test_ingestion_does_not_load_the_search_layer():
+    # Pre-processing without embeddings must not import sentence-transformers or chromadb
+    code = (
+        "import sys, evaluator.main, evaluator.data.ingestion; "
+        "sys.exit('evaluator.data.vector_search' in sys.modules)"
+    )
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
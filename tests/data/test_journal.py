@@ -0,0 +1,58 @@
+from pathlib import Path
+
+from evaluator.data.journal import ResultJournal
+from evaluator.models.qa import QA
+
+
+def test_appended_answers_are_replayed(tmp_path: Path):
+    journal_file = tmp_path / "model.jsonl"
+    with ResultJournal(journal_file, fsync_every=2) as journal:
+        journal.append(1, QA(question="", answer="A"))
+        journal.append(2, QA(question="", answer="B"))
+        journal.append(1, QA(question="", answer="C"))
+
+    replayed = ResultJournal(journal_file).replay()
+
+    # Later entries for the same question win
+    assert replayed == {1: QA(question="", answer="C"), 2: QA(question="", answer="B")}
+
+
+def test_replay_skips_partially_written_line(tmp_path: Path):
+    journal_file = tmp_path / "model.jsonl"
+    journal_file.write_text(
+        '{"q_number": 1, "question": "", "answer": "A"}\n{"q_number": 2, "ans',
+        encoding="utf-8",
+    )
+
+    assert ResultJournal(journal_file).replay() == {1: QA(question="", answer="A")}
+
+
+def test_answers_appended_after_a_partially_written_line_are_replayed(tmp_path: Path):
+    journal_file = tmp_path / "model.jsonl"
+    with ResultJournal(journal_file) as journal:
+        journal.append(1, QA(question="", answer="A"))
+    with journal_file.open("a", encoding="utf-8") as f:
+        f.write('{"q_number": 2, "ans')
+
+    # The resumed run answers the question whose line was cut off
+    with ResultJournal(journal_file) as journal:
+        journal.append(2, QA(question="", answer="B"))
+
+    assert ResultJournal(journal_file).replay() == {
+        1: QA(question="", answer="A"),
+        2: QA(question="", answer="B"),
+    }
+
+
+def test_replay_of_missing_journal_is_empty(tmp_path: Path):
+    assert ResultJournal(tmp_path / "missing.jsonl").replay() == {}
+
+
+def test_discard_removes_the_journal(tmp_path: Path):
+    journal_file = tmp_path / "model.jsonl"
+    journal = ResultJournal(journal_file)
+    journal.append(1, QA(question="", answer="A"))
+
+    journal.discard()
+
+    assert not journal_file.exists()
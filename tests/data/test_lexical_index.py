@@ -0,0 +1,45 @@
+from evaluator.data.lexical_index import BM25Index, tokenize
+
+
+def test_tokenize_keeps_names_and_years():
+    assert tokenize("The Treaty of Paris (1783) ended it.") == [
+        "the",
+        "treaty",
+        "of",
+        "paris",
+        "1783",
+        "ended",
+        "it",
+    ]
+
+
+def test_search_ranks_exact_term_matches_first():
+    index = BM25Index(
+        {
+            "0": "The Louisiana Purchase in 1803 doubled the size of the nation",
+            "1": "The Missouri Compromise of 1820 balanced free and slave states",
+            "2": "The purchase of land from the native nations in the west",
+        }
+    )
+
+    hit_ids, scores = index.search(["What happened in 1803?", "missouri compromise"], k=3)
+
+    assert hit_ids[0][0] == "0"
+    assert hit_ids[1] == ["1"]
+    # Chunks without any query term are left out
+    assert "1" not in hit_ids[0]
+    assert all(score > 0 for row in scores for score in row)
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = BM25Index({"0": "war war war of the era", "1": "the alien and sedition acts of war"})
+
+    hit_ids, _ = index.search(["sedition war"], k=2)
+
+    assert hit_ids[0][0] == "1"
+
+
+def test_search_without_matches_is_empty():
+    index = BM25Index({"0": "colonial trade"})
+
+    assert index.search(["industrial revolution"], k=5) == ([[]], [[]])
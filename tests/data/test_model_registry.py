@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+import pytest
+
+from evaluator.data import model_registry
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    model_registry.clear_models()
+    yield
+    model_registry.clear_models()
+
+
+def test_models_are_loaded_once_and_shared():
+    with patch("evaluator.data.model_registry.SentenceTransformer") as loader:
+        first = model_registry.get_embedding_model("model-a")
+        second = model_registry.get_embedding_model("model-a")
+
+    assert first is second
+    loader.assert_called_once_with("model-a")
+
+
+def test_models_are_keyed_by_kind_and_name():
+    with (
+        patch("evaluator.data.model_registry.SentenceTransformer") as embedding_loader,
+        patch("evaluator.data.model_registry.CrossEncoder") as cross_encoder_loader,
+    ):
+        model_registry.get_embedding_model("model-a")
+        model_registry.get_embedding_model("model-b")
+        model_registry.get_cross_encoder("model-a")
+
+    assert embedding_loader.call_count == 2
+    cross_encoder_loader.assert_called_once_with("model-a")
+
+
+def test_registered_models_are_not_loaded():
+    stub_model = object()
+    model_registry.register_model("cross_encoder", "stub", stub_model)
+
+    with patch("evaluator.data.model_registry.CrossEncoder") as loader:
+        assert model_registry.get_cross_encoder("stub") is stub_model
+
+    loader.assert_not_called()
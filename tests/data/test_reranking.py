@@ -0,0 +1,87 @@
+from pathlib import Path
+from unittest.mock import Mock
+
+from evaluator.data.reranking import Reranker, RerankScoreCache, adaptive_pool_size
+
+CHUNKS = {"0": "alpha", "1": "beta", "2": "gamma", "3": "epsilon"}
+
+
+def length_scores(pairs):
+    # Longer documents are more relevant
+    return [float(len(document)) for _, document in pairs]
+
+
+def test_rerank_orders_candidates_by_score():
+    reranker = Reranker(length_scores)
+
+    ranked = reranker.rerank(["q1", "q2"], [["0", "1", "3"], ["1", "2"]], CHUNKS, limit=2)
+
+    assert ranked == [["3", "0"], ["2", "1"]]
+
+
+def test_cached_scores_are_not_predicted_again():
+    predict = Mock(side_effect=length_scores)
+    reranker = Reranker(predict, RerankScoreCache())
+
+    reranker.rerank(["q1"], [["0", "1"]], CHUNKS, limit=1)
+    ranked = reranker.rerank(["q1", "q2"], [["1", "2"], ["0"]], CHUNKS, limit=1)
+
+    assert ranked == [["2"], ["0"]]
+    # Only the pairs not scored by the first call reach the cross-encoder, in one batch
+    assert predict.call_count == 2
+    predict.assert_called_with([("q1", "gamma"), ("q2", "alpha")])
+
+
+def test_scores_are_reloaded_from_cache_file(tmp_path: Path):
+    cache_file = tmp_path / "scores.jsonl"
+    RerankScoreCache(cache_file=cache_file).put_many([("q", "0"), ("q", "1")], [0.5, 0.25])
+    with cache_file.open("a", encoding="utf-8") as f:
+        f.write('{"query": "q", "chu')
+
+    cache = RerankScoreCache(cache_file=cache_file)
+
+    assert cache.get_many([("q", "1"), ("q", "2")]) == [0.25, None]
+
+
+def test_scores_put_after_a_partially_written_line_are_reloaded(tmp_path: Path):
+    cache_file = tmp_path / "scores.jsonl"
+    RerankScoreCache(cache_file=cache_file).put_many([("q", "0")], [0.5])
+    with cache_file.open("a", encoding="utf-8") as f:
+        # A cut off line and a line of valid JSON that is not a score
+        f.write('{"query": "q", "chunk_id": "x"}\n{"query": "q", "chu')
+
+    RerankScoreCache(cache_file=cache_file).put_many([("q", "1")], [0.25])
+    cache = RerankScoreCache(cache_file=cache_file)
+
+    assert cache.get_many([("q", "0"), ("q", "1")]) == [0.5, 0.25]
+
+
+def test_cache_file_is_compacted_to_the_live_scores(tmp_path: Path):
+    cache_file = tmp_path / "scores.jsonl"
+    cache = RerankScoreCache(max_entries=2, cache_file=cache_file)
+    # Evicted scores are computed and appended again
+    for chunk_id in ["0", "1", "2", "0", "1"]:
+        cache.put_many([("q", chunk_id)], [float(chunk_id)])
+
+    assert len(cache_file.read_text(encoding="utf-8").splitlines()) <= 4
+    reloaded = RerankScoreCache(max_entries=2, cache_file=cache_file)
+    assert reloaded.get_many([("q", "0"), ("q", "1"), ("q", "2")]) == [0.0, 1.0, None]
+
+
+def test_cache_evicts_least_recently_used_scores():
+    cache = RerankScoreCache(max_entries=2)
+    cache.put_many([("q", "0"), ("q", "1")], [1.0, 2.0])
+    cache.get_many([("q", "0")])
+    cache.put_many([("q", "2")], [3.0])
+
+    assert cache.get_many([("q", "0"), ("q", "1"), ("q", "2")]) == [1.0, None, 3.0]
+
+
+def test_adaptive_pool_stops_at_a_clear_margin():
+    scores = [0.9, 0.85, 0.8, 0.78, 0.4, 0.35, 0.3]
+
+    assert adaptive_pool_size(scores, keep=3, margin=0.05, min_candidates=2) == 4
+    # Never fewer than min_candidates, nor more than retrieved
+    assert adaptive_pool_size(scores, keep=3, margin=0.05, min_candidates=6) == 6
+    assert adaptive_pool_size(scores, keep=3, margin=1.0, min_candidates=2) == 7
+    assert adaptive_pool_size(scores[:2], keep=3, margin=0.0, min_candidates=5) == 2
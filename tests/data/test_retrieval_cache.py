@@ -0,0 +1,71 @@
+from pathlib import Path
+
+from evaluator.data.retrieval_cache import RetrievalCache
+
+
+def test_get_returns_none_for_unknown_query():
+    cache = RetrievalCache()
+    assert cache.get("unknown") is None
+
+
+def test_put_evicts_least_recently_used_entry():
+    cache = RetrievalCache(max_entries=2)
+    cache.put("q1", ["doc_1"])
+    cache.put("q2", ["doc_2"])
+
+    # Touch q1 so q2 becomes the least recently used entry
+    assert cache.get("q1") == ["doc_1"]
+    cache.put("q3", ["doc_3"])
+
+    assert cache.get("q2") is None
+    assert cache.get("q1") == ["doc_1"]
+    assert cache.get("q3") == ["doc_3"]
+
+
+def test_results_are_reloaded_from_cache_file(tmp_path: Path):
+    cache_file = tmp_path / "retrieval.jsonl"
+    cache = RetrievalCache(cache_file=cache_file)
+    cache.put("q1", ["doc_1", "doc_2"])
+    cache.put("q2", [])
+
+    reloaded = RetrievalCache(cache_file=cache_file)
+
+    assert reloaded.get("q1") == ["doc_1", "doc_2"]
+    assert reloaded.get("q2") == []
+
+
+def test_partially_written_line_is_ignored(tmp_path: Path):
+    cache_file = tmp_path / "retrieval.jsonl"
+    cache_file.write_text(
+        '{"query": "q1", "documents": ["doc_1"]}\n{"query": "q2", "docu', encoding="utf-8"
+    )
+
+    cache = RetrievalCache(cache_file=cache_file)
+
+    assert len(cache) == 1
+    assert cache.get("q1") == ["doc_1"]
+
+
+def test_results_put_after_a_partially_written_line_are_reloaded(tmp_path: Path):
+    cache_file = tmp_path / "retrieval.jsonl"
+    cache_file.write_text(
+        '{"query": "q1", "documents": ["doc_1"]}\n{"query": "q2", "docu', encoding="utf-8"
+    )
+
+    RetrievalCache(cache_file=cache_file).put("q2", ["doc_2"])
+    reloaded = RetrievalCache(cache_file=cache_file)
+
+    assert reloaded.get("q1") == ["doc_1"]
+    assert reloaded.get("q2") == ["doc_2"]
+
+
+def test_cache_file_does_not_grow_beyond_the_live_results(tmp_path: Path):
+    cache_file = tmp_path / "retrieval.jsonl"
+    cache = RetrievalCache(max_entries=2, cache_file=cache_file)
+    for i in range(20):
+        cache.put(f"q{i % 4}", [f"doc_{i % 4}"])
+
+    assert len(cache_file.read_text(encoding="utf-8").splitlines()) <= 4
+    reloaded = RetrievalCache(max_entries=2, cache_file=cache_file)
+    assert len(reloaded) == 2
+    assert reloaded.get("q3") == ["doc_3"]
@@ -0,0 +1,187 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from evaluator.data.vector_index import (
+    QUANTIZATIONS,
+    NumpyVectorIndex,
+    QuantizedVectorIndex,
+    normalize_embeddings,
+    quantize_embeddings,
+    top_k,
+)
+
+INDEX_METADATA = {
+    "chunking_style": "title_chunking",
+    "embedding_model": "test-model",
+    "chunk_file_sha256": "abc",
+}
+
+
+def fake_embed(documents):
+    # One-hot style embeddings based on the first character of the document
+    embeddings = np.zeros((len(documents), 4), dtype=np.float32)
+    for i, document in enumerate(documents):
+        embeddings[i, ord(document[0]) % 4] = 1.0
+        embeddings[i, (ord(document[0]) + 1) % 4] = 0.1
+    return embeddings
+
+
+@pytest.fixture
+def chunks():
+    return {"0": "a chunk", "1": "b chunk", "2": "c chunk", "3": "d chunk"}
+
+
+def test_search_returns_nearest_chunks_in_order(chunks):
+    index = NumpyVectorIndex.build(chunks, fake_embed)
+
+    hit_ids, scores = index.search(fake_embed(["c query", "a query"]), k=2)
+
+    assert [ids[0] for ids in hit_ids] == ["2", "0"]
+    assert all(row[0] >= row[1] for row in scores)
+
+
+def test_search_caps_k_at_corpus_size(chunks):
+    index = NumpyVectorIndex.build(chunks, fake_embed)
+
+    hit_ids, _ = index.search(fake_embed(["a query"]), k=10)
+
+    assert sorted(hit_ids[0]) == ["0", "1", "2", "3"]
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.standard_normal((5, 50)).astype(np.float32)
+    ids = [str(i) for i in range(50)]
+
+    hit_ids, _ = top_k(scores, 7, ids)
+
+    expected = [[str(i) for i in np.argsort(-row, kind="stable")[:7]] for row in scores]
+    assert hit_ids == expected
+
+
+def test_normalize_embeddings_produces_unit_vectors():
+    embeddings = normalize_embeddings(np.array([[3.0, 4.0], [0.0, 0.0]]))
+
+    assert embeddings.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(embeddings[0]), 1.0, rtol=1e-6)
+    np.testing.assert_array_equal(embeddings[1], [0.0, 0.0])
+
+
+def test_load_or_build_reuses_persisted_index(tmp_path: Path, chunks):
+    built = NumpyVectorIndex.load_or_build(
+        tmp_path, "key1", INDEX_METADATA, chunks, fake_embed
+    )
+
+    def failing_embed(documents):
+        raise AssertionError("index should not be rebuilt")
+
+    loaded = NumpyVectorIndex.load_or_build(
+        tmp_path, "key1", INDEX_METADATA, chunks, failing_embed
+    )
+
+    assert isinstance(loaded.embeddings, np.memmap)
+    assert loaded.ids == built.ids
+    np.testing.assert_array_equal(loaded.embeddings, built.embeddings)
+
+
+def test_load_or_build_drops_stale_index(tmp_path: Path, chunks):
+    NumpyVectorIndex.load_or_build(tmp_path, "old", INDEX_METADATA, chunks, fake_embed)
+
+    NumpyVectorIndex.load_or_build(
+        tmp_path, "new", {**INDEX_METADATA, "chunk_file_sha256": "def"}, chunks, fake_embed
+    )
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["new.json", "new.npy"]
+
+
+def random_index(num_chunks=2000, dim=64):
+    rng = np.random.default_rng(0)
+    embeddings = normalize_embeddings(rng.standard_normal((num_chunks, dim)))
+    return NumpyVectorIndex([str(i) for i in range(num_chunks)], embeddings)
+
+
+# Random embeddings are the worst case for binary codes, every neighbour but the first is
+# barely closer than the rest of the corpus
+@pytest.mark.parametrize("quantization, min_recall", [("int8", 0.95), ("binary", 0.5)])
+def test_quantized_search_matches_exact_search(quantization, min_recall):
+    index = random_index()
+    quantized = QuantizedVectorIndex.quantize(index, quantization, rescore_multiplier=8)
+    # Queries close to some of the chunks, as questions are to their relevant context
+    queries = index.embeddings[:20] + 0.05 * np.random.default_rng(1).standard_normal((20, 64))
+
+    exact_ids, _ = index.search(queries, k=5)
+    hit_ids, scores = quantized.search(queries, k=5)
+
+    recall = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(hit_ids, exact_ids)])
+    assert recall >= min_recall
+    assert [ids[0] for ids in hit_ids] == [str(i) for i in range(20)]
+    # Rescored with the float32 embeddings, so the order is by exact similarity
+    assert all(row == sorted(row, reverse=True) for row in scores)
+    assert quantized.nbytes < index.embeddings.nbytes / (4 if quantization == "int8" else 32) + 512
+
+
+@pytest.mark.parametrize("quantization", QUANTIZATIONS)
+def test_blockwise_shortlist_keeps_the_best_approximate_scores(quantization):
+    index = random_index(1000)
+    queries = index.embeddings[:10]
+    codes, scales = quantize_embeddings(index.embeddings, quantization)
+    # Blocks smaller than the shortlist and not dividing the number of chunks
+    quantized = QuantizedVectorIndex(
+        index.ids, index.embeddings, codes, scales, quantization, block_size=37
+    )
+
+    # Approximate score of every chunk, binary codes tie often so scores are compared
+    if scales is not None:
+        approximate = queries @ (codes * scales).T
+    else:
+        signs = np.unpackbits(codes, axis=1).astype(bool)
+        approximate = -(signs[np.newaxis] != (queries > 0)[:, np.newaxis]).sum(axis=2)
+
+    shortlist = quantized._shortlist(queries, 50)
+
+    assert shortlist.shape == (10, 50)
+    for row, candidates in enumerate(shortlist):
+        np.testing.assert_allclose(
+            np.sort(approximate[row, candidates]), np.sort(approximate[row])[-50:], rtol=1e-5
+        )
+
+
+def test_int8_codes_approximate_the_embeddings():
+    embeddings = random_index(100).embeddings
+    codes, scales = quantize_embeddings(embeddings, "int8")
+
+    assert codes.dtype == np.int8
+    assert scales is not None
+    np.testing.assert_allclose(codes * scales, embeddings, atol=float(scales.max()))
+
+
+def test_load_or_quantize_reuses_persisted_codes(tmp_path: Path, chunks):
+    index = NumpyVectorIndex.load_or_build(tmp_path, "key1", INDEX_METADATA, chunks, fake_embed)
+    built = QuantizedVectorIndex.load_or_quantize(index, tmp_path, "key1", "binary")
+    loaded = QuantizedVectorIndex.load_or_quantize(index, tmp_path, "key1", "binary")
+
+    np.testing.assert_array_equal(loaded.codes, built.codes)
+    assert loaded.search(fake_embed(["c query"]), k=1)[0] == [["2"]]
+
+    # Codes are dropped together with the stale index they were computed from
+    NumpyVectorIndex.load_or_build(
+        tmp_path, "key2", {**INDEX_METADATA, "chunk_file_sha256": "def"}, chunks, fake_embed
+    )
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["key2.json", "key2.npy"]
+
+
+def test_load_or_build_keeps_index_with_other_embedding_settings(tmp_path: Path, chunks):
+    NumpyVectorIndex.load_or_build(tmp_path, "a", INDEX_METADATA, chunks, fake_embed)
+
+    NumpyVectorIndex.load_or_build(
+        tmp_path, "b", {**INDEX_METADATA, "embedding_dtype": "float16"}, chunks, fake_embed
+    )
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "a.json",
+        "a.npy",
+        "b.json",
+        "b.npy",
+    ]
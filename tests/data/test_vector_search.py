@@ -0,0 +1,321 @@
+import json
+from dataclasses import replace
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from evaluator.data import model_registry, vector_search
+from evaluator.data.file_io import read_concept_chunks
+from evaluator.data.vector_index import (
+    ChromaVectorIndex,
+    NumpyVectorIndex,
+    create_chroma_client,
+)
+from evaluator.data.vector_search import (
+    CustomEmbedder,
+    HybridSearch,
+    SearchConfiguration,
+    clear_shared_indexes,
+    concept_chunk_file,
+    create_context_retriever,
+    embedding_artifact_files,
+    embedding_metadata,
+    precompute_embeddings,
+    reciprocal_rank_fusion,
+)
+
+
+def test_embed_keeps_the_encoded_matrix():
+    encoded = np.arange(6, dtype=np.float32).reshape(2, 3)
+    model = Mock()
+    model.encode.return_value = encoded
+    embedder = CustomEmbedder(model, batch_size=16, normalize=False)
+
+    embeddings = embedder.embed(["a", "b"])
+
+    assert embeddings is encoded
+    model.encode.assert_called_once_with(
+        ["a", "b"], batch_size=16, normalize_embeddings=False, convert_to_numpy=True
+    )
+
+
+def test_embed_converts_to_configured_dtype():
+    model = Mock()
+    model.encode.return_value = np.ones((2, 3), dtype=np.float32)
+    embedder = CustomEmbedder(model, dtype="float16")
+
+    assert embedder.embed(["a", "b"]).dtype == np.float16
+
+
+def test_call_returns_rows_of_the_embedding_matrix():
+    encoded = np.ones((2, 3), dtype=np.float32)
+    model = Mock()
+    model.encode.return_value = encoded
+    embedder = CustomEmbedder(model)
+
+    rows = embedder(["a", "b"])
+
+    assert len(rows) == 2
+    assert all(np.shares_memory(row, encoded) for row in rows)
+
+
+def test_reciprocal_rank_fusion_combines_rankings():
+    fused, scores = reciprocal_rank_fusion(
+        [["a", "b", "c"], ["c", "d"]], weights=[0.5, 0.5], k=1
+    )
+
+    # c is found by both rankings, ties keep the order of the first ranking
+    assert fused == ["c", "a", "b", "d"]
+    assert scores == sorted(scores, reverse=True)
+    assert reciprocal_rank_fusion([["a", "b"], ["b"]], weights=[1.0, 0.0], limit=1)[0] == ["a"]
+
+
+class FirstWordEmbedder:
+    # Embeds only the first word of a text, so dense search misses everything else
+    def encode(self, sentences, **kwargs):
+        embeddings = np.zeros((len(sentences), 32), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            embeddings[row, sum(map(ord, sentence.split()[0].lower())) % 32] = 1.0
+        return embeddings
+
+
+@pytest.fixture
+def concepts(tmp_path, monkeypatch):
+    clear_shared_indexes()
+    model_registry.register_model("embedding", "first-word", FirstWordEmbedder())
+    chunk_file = tmp_path / "processed" / "ap_history_concepts_test.jsonl"
+    chunk_file.parent.mkdir()
+    texts = ["Slavery expanded west", "Jamestown was founded in 1607", "Puritans settled Boston"]
+    chunk_file.write_text(
+        "".join(json.dumps({"id": str(i), "text": text}) + "\n" for i, text in enumerate(texts))
+    )
+    monkeypatch.setattr(vector_search, "get_data_path", lambda path: tmp_path / path)
+    yield SearchConfiguration(
+        max_results=1,
+        embedding_model="first-word",
+        chunking_style="test",
+        backend="numpy",
+        persist_index=False,
+        cache_results=False,
+    )
+    clear_shared_indexes()
+    model_registry.clear_models()
+
+
+def test_hybrid_search_finds_keyword_matches(concepts):
+    dense = create_context_retriever(concepts)
+    hybrid = create_context_retriever(replace(concepts, retriever="hybrid", dense_weight=0.2))
+
+    assert isinstance(hybrid, HybridSearch)
+    # Both share the index loaded for the first retriever
+    assert hybrid.index is dense.index
+    assert dense.query("When was Jamestown founded?") != ["Jamestown was founded in 1607"]
+    assert hybrid.query("When was Jamestown founded?") == ["Jamestown was founded in 1607"]
+
+
+def test_unknown_retriever_is_rejected(concepts):
+    with pytest.raises(ValueError):
+        create_context_retriever(replace(concepts, retriever="sparse"))
+
+
+def test_adaptive_rerank_skips_candidates_behind_a_margin(concepts):
+    cross_encoder = Mock()
+    cross_encoder.predict.side_effect = lambda pairs, **kwargs: [0.0] * len(pairs)
+    model_registry.register_model("cross_encoder", "stub", cross_encoder)
+    config = replace(
+        concepts,
+        enable_reranking=True,
+        cross_encoding_model="stub",
+        rerank_margin=0.5,
+        min_rerank_candidates=1,
+    )
+
+    create_context_retriever(config).query("Jamestown settlers")
+
+    # Only the chunk matching the embedded first word is close enough to be reranked
+    (pairs,), _ = cross_encoder.predict.call_args
+    assert pairs == [("Jamestown settlers", "Jamestown was founded in 1607")]
+
+
+def test_quantized_index_returns_the_same_chunks(concepts):
+    dense = create_context_retriever(concepts)
+    quantized = create_context_retriever(replace(concepts, quantization="int8"))
+
+    assert quantized.index is not dense.index
+    assert quantized.query("Puritans in Boston") == dense.query("Puritans in Boston")
+
+    with pytest.raises(ValueError):
+        create_context_retriever(replace(concepts, backend="chroma", quantization="int8"))
+
+
+class CountingEmbedder(FirstWordEmbedder):
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, sentences, **kwargs):
+        self.encoded.extend(sentences)
+        return super().encode(sentences, **kwargs)
+
+
+def read_chunks(chunk_file):
+    chunks = read_concept_chunks(chunk_file)
+    assert chunks is not None
+    return chunks
+
+
+def test_precomputed_embeddings_round_trip(concepts):
+    assert precompute_embeddings(concepts)
+    chunk_file = concept_chunk_file(concepts.chunking_style)
+    embeddings_file, sidecar_file = embedding_artifact_files(chunk_file, "first-word")
+
+    loaded = NumpyVectorIndex.load(
+        embeddings_file, sidecar_file, embedding_metadata(concepts, chunk_file)
+    )
+
+    assert loaded is not None
+    assert loaded.ids == ["0", "1", "2"]
+    assert isinstance(loaded.embeddings, np.memmap)
+    np.testing.assert_array_equal(
+        loaded.embeddings, FirstWordEmbedder().encode(list(read_chunks(chunk_file).values()))
+    )
+
+
+def test_precomputed_embeddings_of_other_chunks_or_settings_are_ignored(concepts):
+    precompute_embeddings(concepts)
+    chunk_file = concept_chunk_file(concepts.chunking_style)
+    files = embedding_artifact_files(chunk_file, "first-word")
+
+    other_settings = replace(concepts, normalize_embeddings=False)
+    assert NumpyVectorIndex.load(*files, embedding_metadata(other_settings, chunk_file)) is None
+
+    with chunk_file.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "3", "text": "Lincoln was elected"}) + "\n")
+    assert NumpyVectorIndex.load(*files, embedding_metadata(concepts, chunk_file)) is None
+
+    # Pre-processing again replaces the stale embeddings
+    precompute_embeddings(concepts)
+    loaded = NumpyVectorIndex.load(*files, embedding_metadata(concepts, chunk_file))
+    assert loaded is not None and loaded.ids == ["0", "1", "2", "3"]
+
+
+@pytest.mark.parametrize("backend", ["numpy", "chroma"])
+def test_vector_search_uses_precomputed_embeddings(concepts, backend):
+    precompute_embeddings(concepts)
+    expected = create_context_retriever(concepts).query("Puritans in Boston")
+    clear_shared_indexes()
+
+    embedder = CountingEmbedder()
+    model_registry.register_model("embedding", "first-word", embedder)
+    search = create_context_retriever(replace(concepts, backend=backend))
+
+    assert search.query("Puritans in Boston") == expected
+    # Only the query was embedded, the chunks came from the pre-processing
+    assert embedder.encoded == ["Puritans in Boston"]
+
+
+def test_precomputed_embeddings_can_be_disabled(concepts):
+    precompute_embeddings(concepts)
+    clear_shared_indexes()
+    embedder = CountingEmbedder()
+    model_registry.register_model("embedding", "first-word", embedder)
+
+    create_context_retriever(replace(concepts, precomputed_embeddings=False))
+
+    assert len(embedder.encoded) == 3
+
+
+@pytest.fixture
+def persisted_chroma(concepts, tmp_path):
+    embedder = CountingEmbedder()
+    model_registry.register_model("embedding", "first-word", embedder)
+    config = replace(concepts, backend="chroma", persist_index=True, precomputed_embeddings=False)
+    return config, embedder, create_chroma_client(tmp_path / "indexes" / "chroma")
+
+
+def chroma_collection(search):
+    assert isinstance(search.index, ChromaVectorIndex)
+    return search.index.collection
+
+
+def collection_names(client):
+    return sorted(
+        existing if isinstance(existing, str) else existing.name
+        for existing in client.list_collections()
+    )
+
+
+def test_complete_chroma_collection_is_reused(persisted_chroma):
+    config, embedder, client = persisted_chroma
+    built = create_context_retriever(config)
+    assert len(embedder.encoded) == 3
+
+    clear_shared_indexes()
+    embedder.encoded.clear()
+    loaded = create_context_retriever(config)
+
+    assert loaded.index is not built.index
+    assert embedder.encoded == []
+    assert loaded.query("Puritans in Boston") == ["Puritans settled Boston"]
+    assert collection_names(client) == [f"ap_history_concepts_{built.index_key}"]
+
+
+def test_incomplete_chroma_collection_is_rebuilt(persisted_chroma):
+    config, embedder, client = persisted_chroma
+    built = create_context_retriever(config)
+    clear_shared_indexes()
+
+    # An interrupted build leaves a collection that was never marked complete
+    name = f"ap_history_concepts_{built.index_key}"
+    client.delete_collection(name)
+    client.create_collection(name, embedding_function=built.embedder).upsert(
+        ids=["0"], documents=["Slavery expanded west"], embeddings=[[1.0] + [0.0] * 31]
+    )
+    embedder.encoded.clear()
+
+    search = create_context_retriever(config)
+
+    assert len(embedder.encoded) == 3
+    assert chroma_collection(search).count() == 3
+    assert chroma_collection(search).metadata["complete"]
+
+
+def test_chroma_collection_of_changed_chunks_is_replaced(persisted_chroma):
+    config, embedder, client = persisted_chroma
+    old_key = create_context_retriever(config).index_key
+    clear_shared_indexes()
+
+    chunk_file = concept_chunk_file(config.chunking_style)
+    with chunk_file.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "3", "text": "Lincoln was elected"}) + "\n")
+    search = create_context_retriever(config)
+
+    assert search.index_key != old_key
+    assert chroma_collection(search).count() == 4
+    assert collection_names(client) == [f"ap_history_concepts_{search.index_key}"]
+
+
+def test_chroma_collection_is_keyed_by_embedding_model(persisted_chroma):
+    config, embedder, client = persisted_chroma
+    first = create_context_retriever(config)
+    other_embedder = CountingEmbedder()
+    model_registry.register_model("embedding", "other-model", other_embedder)
+
+    second = create_context_retriever(replace(config, embedding_model="other-model"))
+
+    # The other model gets its own index, the first one stays usable
+    assert len(other_embedder.encoded) == 3
+    assert collection_names(client) == sorted(
+        f"ap_history_concepts_{search.index_key}" for search in (first, second)
+    )
+    assert first.query("Puritans in Boston") == ["Puritans settled Boston"]
+
+
+def test_chroma_collections_with_other_embedding_settings_are_kept(persisted_chroma):
+    config, embedder, client = persisted_chroma
+    first = create_context_retriever(config)
+    second = create_context_retriever(replace(config, normalize_embeddings=False))
+
+    assert first.index_key != second.index_key
+    assert len(collection_names(client)) == 2
+    assert first.query("Puritans in Boston") == ["Puritans settled Boston"]
@@ -61,7 +61,7 @@ class TestBasicEval:
             with patch(
                 "evaluator.evals.basic.write_json_to_file", return_value=True
             ) as mock_write:
-                evaluator._generate_answers("test_model")
+                evaluator.run_model("test_model")
 
                 # Assert that the generator was called for each question
                 assert mock_answer_generator.generate.call_count == len(
@@ -93,7 +93,70 @@ class TestBasicEval:
                     ),
                 )
 
-    def test_run_eval_calls_generate_answers_for_each_model(
+    def test_generate_answers_resumes_from_journal(
+        self, sample_qa_collection, mock_answer_generator, mock_answer_generator_factory
+    ):
+        with TemporaryDirectory() as tmpdir:
+            output_dir = Path(tmpdir)
+            evaluator = basic.BasicEval(
+                models=["test_model"],
+                qa_collection=sample_qa_collection,
+                answer_generator=mock_answer_generator_factory,
+                output_dir=output_dir,
+            )
+
+            # Journal left behind by an interrupted run
+            journal_file = output_dir / "basic" / "test_model.jsonl"
+            journal_file.parent.mkdir(parents=True)
+            journal_file.write_text(
+                '{"q_number": 1, "question": "", "answer": "B"}\n', encoding="utf-8"
+            )
+
+            with patch(
+                "evaluator.evals.basic.write_json_to_file", return_value=True
+            ) as mock_write:
+                evaluator.run_model("test_model")
+
+                # Only the questions missing from the journal are asked
+                assert mock_answer_generator.generate.call_count == 2
+                written_collection = mock_write.call_args.args[1]
+                assert written_collection.qa_map[1] == QA(question="", answer="B")
+
+            # The journal is removed once compacted into the JSON output
+            assert not journal_file.exists()
+
+    def test_generate_answers_in_batches(
+        self, sample_qa_collection, mock_answer_generator, mock_answer_generator_factory
+    ):
+        mock_answer_generator.generate_batch.side_effect = lambda questions: {
+            q_number: Mock(answer="b") for q_number in questions
+        }
+        with TemporaryDirectory() as tmpdir:
+            evaluator = basic.BasicEval(
+                models=["test_model"],
+                qa_collection=sample_qa_collection,
+                answer_generator=mock_answer_generator_factory,
+                output_dir=Path(tmpdir),
+                batch_size=2,
+            )
+
+            with patch(
+                "evaluator.evals.basic.write_json_to_file", return_value=True
+            ) as mock_write:
+                evaluator.run_model("test_model")
+
+                # Two questions share a request, the remaining one is asked on its own
+                mock_answer_generator.generate_batch.assert_called_once_with({1: "Q1", 2: "Q2"})
+                mock_answer_generator.generate.assert_called_once_with("Q3")
+                written_collection = mock_write.call_args.args[1]
+                assert [qa.answer for qa in written_collection.qa_map.values()] == ["B", "B", "A"]
+
+            # Batches are asked with a system prompt expecting one answer per question
+            system_prompts = [call.args[1] for call in mock_answer_generator_factory.call_args_list]
+            assert len(set(system_prompts)) == 2
+            assert "several numbered questions" in system_prompts[1]
+
+    def test_run_eval_runs_each_model(
         self, sample_qa_collection, mock_answer_generator_factory
     ):
         with TemporaryDirectory() as tmpdir:
@@ -105,10 +168,10 @@ class TestBasicEval:
                 output_dir=output_dir,
             )
 
-            with patch.object(evaluator, "_generate_answers") as mock_generate_answers:
+            with patch.object(evaluator, "run_model") as mock_run_model:
                 evaluator.run_eval()
 
                 # Assert that the method was called for each model
-                assert mock_generate_answers.call_count == 2
-                mock_generate_answers.assert_any_call("model_a")
-                mock_generate_answers.assert_any_call("model_b")
+                assert mock_run_model.call_count == 2
+                mock_run_model.assert_any_call("model_a", None)
+                mock_run_model.assert_any_call("model_b", None)
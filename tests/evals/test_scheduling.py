@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+from rich.progress import Progress
+
+from evaluator.evals.scheduling import generate_concurrently, run_models_concurrently
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_generate_concurrently_returns_every_result(concurrency):
+    results = dict(
+        generate_concurrently(
+            [1, 2, 3, 4, 5],
+            lambda item: item * 10,
+            concurrency=concurrency,
+            description="test",
+        )
+    )
+
+    assert results == {1: 10, 2: 20, 3: 30, 4: 40, 5: 50}
+
+
+def test_generate_concurrently_advances_shared_progress():
+    with Progress(disable=True) as progress:
+        results = list(
+            generate_concurrently(
+                ["a", "b"],
+                str.upper,
+                concurrency=2,
+                description="test",
+                progress=progress,
+            )
+        )
+        task = progress.tasks[0]
+
+    assert sorted(results) == [("a", "A"), ("b", "B")]
+    assert task.completed == 2
+
+
+def test_generate_concurrently_counts_progress_in_item_sizes():
+    with Progress(disable=True) as progress:
+        list(
+            generate_concurrently(
+                [[1, 2], [3]],
+                len,
+                concurrency=1,
+                description="test",
+                progress=progress,
+                size=len,
+            )
+        )
+        task = progress.tasks[0]
+
+    assert task.total == 3
+    assert task.completed == 3
+
+
+def test_run_models_concurrently_respects_backend_limits():
+    running: dict = {"ollama": 0}
+    peak: dict = {"ollama": 0}
+    finished = []
+    lock = threading.Lock()
+
+    def run_model(model_name: str):
+        backend = model_name.split("/")[0]
+        with lock:
+            running[backend] = running.get(backend, 0) + 1
+            peak[backend] = max(peak.get(backend, 0), running[backend])
+        time.sleep(0.05)
+        with lock:
+            running[backend] -= 1
+            finished.append(model_name)
+
+    models = ["ollama/a", "ollama/b", "ollama/c", "gemini/d", "gemini/e"]
+    run_models_concurrently(
+        models, run_model, max_parallel_models=4, backend_limits={"ollama": 1}
+    )
+
+    assert sorted(finished) == sorted(models)
+    assert peak["ollama"] == 1
+    assert peak["gemini"] == 2
+
+
+def test_run_models_concurrently_raises_model_failure():
+    def run_model(model_name: str):
+        if model_name == "bad":
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        run_models_concurrently(["good", "bad"], run_model, max_parallel_models=2)
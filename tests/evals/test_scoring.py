@@ -0,0 +1,60 @@
+import csv
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from evaluator.evals.scoring import (
+    QUESTIONS_FILE,
+    SCORES_FILE,
+    compute_scores,
+    load_score_matrix,
+    score_model_outputs,
+)
+from evaluator.models.qa import QA, QACollection
+
+
+@pytest.fixture
+def ground_truth():
+    return QACollection(
+        qa_map={q: QA(question=f"Q{q}", answer=answer) for q, answer in zip([1, 2, 3, 4], "ABCD")}
+    )
+
+
+def write_model_output(eval_path: Path, model: str, answers: dict):
+    qa_map = {str(q): {"question": "", "answer": answer} for q, answer in answers.items()}
+    (eval_path / f"{model}.json").write_text(json.dumps({"qa_map": qa_map}), encoding="utf-8")
+
+
+def test_score_matrix_and_statistics(tmp_path: Path, ground_truth):
+    write_model_output(tmp_path, "model_a", {1: "a ", 2: "B", 3: "C", 4: "D"})
+    write_model_output(tmp_path, "model_b", {1: "A", 2: "C", 3: "D"})
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    write_model_output(tmp_path, "bad_keys", {"first": "A"})
+
+    matrix = load_score_matrix(ground_truth, tmp_path)
+    assert matrix.models == ["model_a", "model_b"]
+    assert matrix.answered.tolist() == [[True] * 4, [True, True, True, False]]
+    assert matrix.correct.tolist() == [[True] * 4, [True, False, False, False]]
+
+    scores = compute_scores(matrix, n_bootstrap=200)
+    assert scores.accuracy.tolist() == [1.0, pytest.approx(1 / 3)]
+    assert scores.difficulty.tolist() == [0.0, 0.5, 0.5, 0.0]
+    assert scores.agreement.tolist() == [1.0, 0.5, 0.5, 1.0]
+    assert np.all(scores.ci_low <= scores.accuracy) and np.all(scores.accuracy <= scores.ci_high)
+    assert scores.ci_low[0] == scores.ci_high[0] == 1.0
+
+
+def test_score_model_outputs_writes_tables(tmp_path: Path, ground_truth):
+    write_model_output(tmp_path, "model_a", {1: "A", 2: "A"})
+
+    assert score_model_outputs(ground_truth, tmp_path) == {"model_a": 0.5}
+
+    with (tmp_path / SCORES_FILE).open(encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["model"] == "model_a" and rows[0]["accuracy"] == "0.5000"
+
+    with (tmp_path / QUESTIONS_FILE).open(encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["model_a"] for row in rows] == ["1", "0", "", ""]
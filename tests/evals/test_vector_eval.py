@@ -57,6 +57,9 @@ def mock_context_retriever():
         "mock_doc_2",
         "mock_doc_3",
     ]
+    mock_retriever.query_many.side_effect = lambda queries: [
+        mock_retriever.query.return_value for _ in queries
+    ]
     return mock_retriever
 
 
@@ -84,6 +87,7 @@ class TestVectorEval:
         sample_qa_collection,
         mock_answer_generator,
         mock_answer_generator_factory,
+        mock_context_retriever,
         mock_context_retriever_factory,
     ):
         with TemporaryDirectory() as tmpdir:
@@ -101,7 +105,12 @@ class TestVectorEval:
             with patch(
                 "evaluator.evals.vector_rag.write_json_to_file", return_value=True
             ) as mock_write:
-                evaluator._generate_answers("test_model")
+                evaluator.run_model("test_model")
+
+                # Assert that the context was prefetched in a single batch
+                mock_context_retriever.query_many.assert_called_once_with(
+                    ["Q1", "Q2", "Q3"]
+                )
 
                 # Assert that the generator was called for each question
                 assert mock_answer_generator.generate.call_count == len(
@@ -159,7 +168,7 @@ class TestVectorEval:
                     ),
                 )
 
-    def test_run_eval_calls_generate_answers_for_each_model(
+    def test_run_eval_runs_each_model(
         self,
         sample_qa_collection,
         mock_answer_generator_factory,
@@ -176,10 +185,10 @@ class TestVectorEval:
                 output_dir=output_dir,
             )
 
-            with patch.object(evaluator, "_generate_answers") as mock_generate_answers:
+            with patch.object(evaluator, "run_model") as mock_run_model:
                 evaluator.run_eval()
 
                 # Assert that the method was called for each model
-                assert mock_generate_answers.call_count == 2
-                mock_generate_answers.assert_any_call("model_a")
-                mock_generate_answers.assert_any_call("model_b")
+                assert mock_run_model.call_count == 2
+                mock_run_model.assert_any_call("model_a", None)
+                mock_run_model.assert_any_call("model_b", None)
@@ -0,0 +1,160 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from evaluator.data.file_io import write_json_to_file
+from evaluator.data.vector_search import SearchConfiguration
+from evaluator.experiments import (
+    ExperimentConfig,
+    ExperimentRunner,
+    SharedSearchFactory,
+    expand_grid,
+    load_experiment_config,
+)
+from evaluator.evals.vector_rag import Strategy
+from evaluator.models.qa import QA, QACollection
+from evaluator.rate_limit import RateLimitConfig
+
+
+@pytest.fixture
+def qa_collection():
+    return QACollection(
+        qa_map={
+            1: QA(question="Q1", answer="A"),
+            2: QA(question="Q2", answer="B"),
+        }
+    )
+
+
+def make_strategy(name: str, **search) -> Strategy:
+    return Strategy(name=name, description="", vector_search_config=SearchConfiguration(**search))
+
+
+def test_load_experiment_config_expands_grids(tmp_path):
+    config_file = tmp_path / "experiments.toml"
+    config_file.write_text(
+        """
+models = ["ollama/a", "openai/b"]
+max_parallel_cells = 3
+
+[backend_limits]
+ollama = 1
+
+[rate_limits.openai]
+calls_per_minute = 20
+burst = 2
+
+[[strategies]]
+name = "baseline"
+search = { max_results = 3 }
+
+[[grids]]
+name = "grid_k{max_results}_{chunking_style}"
+search = { max_results = [3, 5], chunking_style = ["title_chunking", "basic_chunking"], enable_reranking = true }
+"""
+    )
+
+    config = load_experiment_config(config_file)
+
+    assert config.models == ["ollama/a", "openai/b"]
+    assert config.max_parallel_cells == 3
+    assert config.backend_limits == {"ollama": 1}
+    assert config.rate_limits == {"openai": RateLimitConfig(calls_per_minute=20, burst=2)}
+    assert [strategy.name for strategy in config.strategies] == [
+        "baseline",
+        "grid_k3_title_chunking",
+        "grid_k3_basic_chunking",
+        "grid_k5_title_chunking",
+        "grid_k5_basic_chunking",
+    ]
+    assert all(strategy.vector_search_config.enable_reranking for strategy in config.strategies[1:])
+
+
+def test_expand_grid_without_lists_gives_one_strategy():
+    strategies = expand_grid("single", {"max_results": 4})
+    assert len(strategies) == 1
+    assert strategies[0].vector_search_config.max_results == 4
+
+
+def test_shared_search_factory_builds_one_search_per_config():
+    factory = Mock(side_effect=lambda config: Mock())
+    shared = SharedSearchFactory(factory)
+
+    first = shared(SearchConfiguration(max_results=3))
+    assert shared(SearchConfiguration(max_results=3)) is first
+    assert shared(SearchConfiguration(max_results=5)) is not first
+    assert factory.call_count == 2
+
+
+def test_build_evaluations_drops_duplicates(qa_collection, tmp_path):
+    config = ExperimentConfig(
+        models=["m1", "m2", "m1"],
+        strategies=[
+            make_strategy("a", max_results=3),
+            make_strategy("a", max_results=3),  # listed twice
+            make_strategy("b", max_results=3),  # same search configuration
+            make_strategy("c", max_results=5),
+        ],
+    )
+    runner = ExperimentRunner(config, qa_collection, Mock(), Mock(), tmp_path)
+
+    evaluations = runner.build_evaluations()
+
+    assert [type(evaluation).__name__ for evaluation in evaluations] == [
+        "BasicEval",
+        "VectorRAGEval",
+        "VectorRAGEval",
+    ]
+    assert [evaluation._eval_dir.name for evaluation in evaluations[1:]] == ["a", "c"]
+    assert all(evaluation.models == ["m1", "m2"] for evaluation in evaluations)
+
+
+def test_build_evaluations_rejects_a_name_reused_for_another_configuration(
+    qa_collection, tmp_path
+):
+    config = ExperimentConfig(
+        models=["m1"],
+        strategies=[make_strategy("a", max_results=3), make_strategy("a", max_results=5)],
+    )
+    runner = ExperimentRunner(config, qa_collection, Mock(), Mock(), tmp_path)
+
+    with pytest.raises(ValueError):
+        runner.build_evaluations()
+
+
+def test_run_skips_completed_cells(qa_collection, tmp_path):
+    # m1 already answered every question of the strategy, m2 only one of them
+    write_json_to_file(
+        tmp_path / "vector_rag" / "a" / "m1.json",
+        QACollection(qa_map={1: QA(question="", answer="A"), 2: QA(question="", answer="B")}),
+    )
+    write_json_to_file(
+        tmp_path / "vector_rag" / "a" / "m2.json",
+        QACollection(qa_map={1: QA(question="", answer="A")}),
+    )
+
+    generator = Mock()
+    generator.generate.return_value = Mock(answer="c")
+    search = Mock()
+    search.query_many.side_effect = lambda queries: [["context"] for _ in queries]
+    vector_search_factory = Mock(return_value=search)
+
+    config = ExperimentConfig(
+        models=["m1", "m2"],
+        strategies=[make_strategy("a")],
+        run_basic=False,
+        max_parallel_cells=1,
+    )
+    runner = ExperimentRunner(
+        config, qa_collection, Mock(return_value=generator), vector_search_factory, tmp_path
+    )
+
+    with patch("evaluator.evals.vector_rag.VectorRAGEval.score") as score:
+        runner.run()
+
+    # Only the missing answer of m2 was generated, with a single index built for the strategy
+    generator.generate.assert_called_once_with("Q2", ["context"])
+    search.query_many.assert_called_once_with(["Q2"])
+    assert vector_search_factory.call_count == 1
+    score.assert_called_once()
+    assert runner.build_cells(runner.build_evaluations()) == []
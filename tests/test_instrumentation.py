@@ -0,0 +1,92 @@
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from evaluator.instrumentation import Tracer
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    tracer.enable()
+    return tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+
+    with tracer.stage("embedding"):
+        pass
+
+    assert tracer.spans == []
+
+
+def test_stages_are_attributed_to_the_current_model(tracer):
+    with tracer.model("model_a"):
+        with tracer.stage("embedding"):
+            pass
+    with tracer.stage("llm_completion"):
+        pass
+
+    assert [(span.model, span.stage) for span in tracer.spans] == [
+        ("model_a", "embedding"),
+        ("-", "llm_completion"),
+    ]
+
+
+def test_model_label_propagates_to_copied_worker_context(tracer):
+    def work():
+        with tracer.stage("reranking"):
+            pass
+
+    with tracer.model("model_b"):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(contextvars.copy_context().run, work).result()
+
+    assert tracer.spans[0].model == "model_b"
+
+
+def test_summary_aggregates_per_model_and_stage(tracer):
+    with tracer.model("model_a"):
+        for _ in range(3):
+            with tracer.stage("embedding"):
+                pass
+
+    stats = tracer.summary()["model_a"]["embedding"]
+
+    assert stats["count"] == 3
+    assert sum(stats["histogram"].values()) == 3
+    assert stats["p50_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+
+
+def test_batched_stages_count_once_per_question(tracer):
+    with tracer.model("model_a"):
+        with tracer.stage("embedding", items=4):
+            pass
+        with tracer.stage("embedding"):
+            pass
+
+    stats = tracer.summary()["model_a"]["embedding"]
+    batch_ms = tracer.spans[0].duration_s * 1000
+
+    assert stats["count"] == 5
+    assert sum(stats["histogram"].values()) == 5
+    assert stats["total_ms"] == pytest.approx(sum(span.duration_s for span in tracer.spans) * 1000)
+    assert stats["p50_ms"] == pytest.approx(batch_ms / 4)
+
+
+def test_export_writes_chrome_trace_events(tracer, tmp_path: Path):
+    with tracer.model("model_a"):
+        with tracer.stage("vector_lookup"):
+            pass
+    trace_file = tmp_path / "trace.json"
+
+    assert tracer.export(trace_file)
+
+    trace = json.loads(trace_file.read_text(encoding="utf-8"))
+    assert trace["traceEvents"][0]["name"] == "vector_lookup"
+    assert trace["traceEvents"][0]["ph"] == "X"
+    assert trace["summary"]["model_a"]["vector_lookup"]["count"] == 1
@@ -0,0 +1,132 @@
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from evaluator.llm import LLMAnswerGenerator
+from evaluator.llm_cache import ResponseCache
+
+
+def completion_response(content: str):
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = content
+    return response
+
+
+@pytest.fixture
+def response_cache(tmp_path: Path):
+    cache = ResponseCache(tmp_path / "responses.sqlite")
+    yield cache
+    cache.close()
+
+
+def test_generate_parses_completion():
+    with patch(
+        "evaluator.llm.completion", return_value=completion_response('{"answer": "C"}')
+    ) as mock_completion:
+        gen = LLMAnswerGenerator("ollama/model", "system")
+        response = gen.generate("Q1")
+
+    assert response.answer == "C"
+    assert mock_completion.call_args.kwargs["messages"][1]["content"] == "Q1"
+
+
+def test_repeated_prompts_are_served_from_cache(response_cache):
+    with patch(
+        "evaluator.llm.completion", return_value=completion_response('{"answer": "B"}')
+    ) as mock_completion:
+        gen = LLMAnswerGenerator("ollama/model", "system", response_cache=response_cache)
+        first = gen.generate("Q1", ["doc"])
+        second = LLMAnswerGenerator(
+            "ollama/model", "system", response_cache=response_cache
+        ).generate("Q1", ["doc"])
+
+    assert first == second
+    assert mock_completion.call_count == 1
+
+
+def test_invalid_responses_are_not_cached(response_cache):
+    with patch(
+        "evaluator.llm.completion", return_value=completion_response("not json")
+    ):
+        gen = LLMAnswerGenerator("ollama/model", "system", response_cache=response_cache)
+        with pytest.raises(ValueError):
+            gen.generate("Q1")
+
+    assert len(response_cache) == 0
+
+
+def test_throttled_completions_are_retried():
+    from litellm.exceptions import RateLimitError
+
+    limiter = Mock()
+    with patch(
+        "evaluator.llm.completion",
+        side_effect=[
+            RateLimitError("slow down", llm_provider="ollama", model="model"),
+            completion_response('{"answer": "A"}'),
+        ],
+    ) as mock_completion:
+        gen = LLMAnswerGenerator("ollama/model", "system", rate_limiter=limiter)
+        response = gen.generate("Q1")
+
+    assert response.answer == "A"
+    assert mock_completion.call_count == 2
+    assert limiter.acquire.call_count == 2
+    limiter.on_throttled.assert_called_once()
+    limiter.on_success.assert_called_once()
+
+
+def test_throttling_is_raised_once_retries_are_exhausted():
+    from litellm.exceptions import RateLimitError
+
+    limiter = Mock()
+    with patch(
+        "evaluator.llm.completion",
+        side_effect=RateLimitError("slow down", llm_provider="ollama", model="model"),
+    ) as mock_completion:
+        gen = LLMAnswerGenerator("ollama/model", "system", rate_limiter=limiter, max_retries=2)
+        with pytest.raises(RateLimitError):
+            gen.generate("Q1")
+
+    assert mock_completion.call_count == 3
+    limiter.on_success.assert_not_called()
+
+
+def test_generate_batch_maps_answers_to_question_numbers():
+    with patch(
+        "evaluator.llm.completion",
+        return_value=completion_response(
+            '{"answers": [{"question_number": 7, "answer": "A"}, '
+            '{"question_number": 3, "answer": "C"}]}'
+        ),
+    ) as mock_completion:
+        gen = LLMAnswerGenerator("ollama/model", "system", rate_limiter=Mock())
+        responses = gen.generate_batch({3: "Q3", 7: "Q7"})
+
+    assert {q: r.answer for q, r in responses.items()} == {3: "C", 7: "A"}
+    assert mock_completion.call_count == 1
+    prompt = mock_completion.call_args.kwargs["messages"][1]["content"]
+    assert "Question 3:\nQ3" in prompt and "Question 7:\nQ7" in prompt
+
+
+def test_generate_batch_falls_back_to_single_questions():
+    with patch(
+        "evaluator.llm.completion",
+        side_effect=[
+            # The batch answer for question 2 is missing
+            completion_response('{"answers": [{"question_number": 1, "answer": "A"}]}'),
+            completion_response('{"answer": "B"}'),
+            # Malformed batch, both questions are asked again
+            completion_response('{"answers": "A, B"}'),
+            completion_response('{"answer": "A"}'),
+            completion_response('{"answer": "B"}'),
+        ],
+    ):
+        gen = LLMAnswerGenerator("ollama/model", "system", rate_limiter=Mock())
+        partial = gen.generate_batch({1: "Q1", 2: "Q2"})
+        malformed = gen.generate_batch({1: "Q1", 2: "Q2"})
+
+    assert {q: r.answer for q, r in partial.items()} == {1: "A", 2: "B"}
+    assert {q: r.answer for q, r in malformed.items()} == {1: "A", 2: "B"}
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+
+from evaluator.llm_cache import ResponseCache, response_cache_key
+from evaluator.models.llm import LLMResponse
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_bytes=30)
+    yield cache
+    cache.close()
+
+
+def test_cache_key_changes_with_every_input():
+    base = ("ollama/model", "system", "prompt", 0.0, LLMResponse)
+    keys = {
+        response_cache_key(*base),
+        response_cache_key("ollama/other", *base[1:]),
+        response_cache_key(base[0], "other system", *base[2:]),
+        response_cache_key(*base[:2], "other prompt", *base[3:]),
+        response_cache_key(*base[:3], 0.5, base[4]),
+    }
+
+    assert len(keys) == 5
+    assert response_cache_key(*base) == response_cache_key(*base)
+
+
+def test_get_returns_stored_content(cache):
+    cache.put("key", '{"answer": "A"}')
+
+    assert cache.get("key") == '{"answer": "A"}'
+    assert cache.get("missing") is None
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.put("first", "a" * 10)
+    cache.put("second", "b" * 10)
+    # Touch the first entry so the second becomes the least recently used
+    cache.get("first")
+
+    cache.put("third", "c" * 15)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == "a" * 10
+    assert cache.get("third") == "c" * 15
+    assert cache.total_bytes() <= 30
+
+
+def test_entries_persist_across_instances(tmp_path: Path):
+    db_file = tmp_path / "responses.sqlite"
+    cache = ResponseCache(db_file)
+    cache.put("key", '{"answer": "B"}')
+    cache.close()
+
+    reopened = ResponseCache(db_file)
+
+    assert reopened.get("key") == '{"answer": "B"}'
+    reopened.close()
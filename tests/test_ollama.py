@@ -0,0 +1,94 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import cast
+from unittest.mock import Mock
+
+import pytest
+
+from evaluator.ollama import OllamaAnswerGenerator, OllamaClientPool
+
+
+class StubOllamaServer(ThreadingHTTPServer):
+    def __init__(self, statuses=None) -> None:
+        super().__init__(("127.0.0.1", 0), StubOllamaHandler)
+        self.requests: list = []
+        self.client_ports: set = set()
+        # Status codes answered before the server starts succeeding
+        self.statuses = list(statuses or [])
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connection open between requests
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = cast(StubOllamaServer, self.server)
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append((self.path, payload))
+        server.client_ports.add(self.client_address[1])
+
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = json.dumps({"message": {"role": "assistant", "content": '{"answer": "D"}'}})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status != 200:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_servers():
+    servers = [StubOllamaServer(), StubOllamaServer()]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_requests_reuse_connections(stub_servers):
+    server = stub_servers[0]
+    with OllamaClientPool([server.url]) as pool:
+        gen = OllamaAnswerGenerator("ollama/qwen3:4b", "system", pool, rate_limiter=Mock())
+        answers = [gen.generate(f"Q{i}").answer for i in range(5)]
+
+    assert answers == ["D"] * 5
+    assert len(server.client_ports) == 1
+
+    path, payload = server.requests[0]
+    assert path == "/api/chat"
+    assert payload["model"] == "qwen3:4b"
+    assert payload["stream"] is False
+    assert payload["messages"][1]["content"] == "Q0"
+
+
+def test_requests_are_spread_over_servers(stub_servers):
+    with OllamaClientPool([server.url for server in stub_servers]) as pool:
+        gen = OllamaAnswerGenerator("ollama/qwen3:4b", "system", pool, rate_limiter=Mock())
+        for i in range(4):
+            gen.generate(f"Q{i}")
+
+    assert [len(server.requests) for server in stub_servers] == [2, 2]
+
+
+def test_overloaded_server_is_retried(stub_servers):
+    server = stub_servers[0]
+    server.statuses = [503]
+    limiter = Mock()
+    with OllamaClientPool([server.url]) as pool:
+        gen = OllamaAnswerGenerator("ollama/qwen3:4b", "system", pool, rate_limiter=limiter)
+        assert gen.generate("Q1").answer == "D"
+
+    assert len(server.requests) == 2
+    limiter.on_throttled.assert_called_once_with(0.0)
@@ -0,0 +1,101 @@
+import threading
+
+from evaluator import rate_limit
+from evaluator.rate_limit import (
+    RateLimitConfig,
+    TokenBucket,
+    configure_rate_limits,
+    get_rate_limiter,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+def make_bucket(clock: FakeClock, **config) -> TokenBucket:
+    return TokenBucket(
+        RateLimitConfig(**{"calls_per_minute": 60, **config}), clock=clock, sleep=clock.sleep
+    )
+
+
+def test_burst_is_served_immediately_then_paced():
+    clock = FakeClock()
+    bucket = make_bucket(clock, burst=3)
+
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.now == 0
+
+    bucket.acquire()
+    assert clock.now == 1
+
+
+def test_throttling_backs_off_and_success_recovers():
+    clock = FakeClock()
+    bucket = make_bucket(clock, backoff_factor=0.5, recovery_fraction=0.25)
+
+    bucket.acquire()
+    bucket.on_throttled(retry_after_s=10)
+    assert bucket.rate == 0.5
+
+    bucket.acquire()
+    assert clock.now >= 10
+
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == bucket.max_rate
+
+
+def test_rate_never_drops_below_minimum():
+    bucket = make_bucket(FakeClock(), min_rate_fraction=0.25)
+    for _ in range(10):
+        bucket.on_throttled()
+    assert bucket.rate == bucket.max_rate * 0.25
+
+
+def test_concurrent_acquires_do_not_exceed_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(RateLimitConfig(calls_per_minute=60, burst=5), clock=clock)
+    acquired = []
+
+    def try_acquire():
+        if bucket._try_acquire() == 0:
+            acquired.append(True)
+
+    threads = [threading.Thread(target=try_acquire) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(acquired) == 5
+
+
+def test_limiters_are_shared_per_backend():
+    assert get_rate_limiter("gemini/gemini-2.5-pro") is get_rate_limiter("gemini/gemini-2.5-flash")
+    assert get_rate_limiter("gemini/gemini-2.5-pro") is not get_rate_limiter("openai/gpt-4o")
+    assert get_rate_limiter("gemini/gemini-2.5-pro").config.calls_per_minute == 8
+
+
+def test_local_models_get_their_own_limiter():
+    assert get_rate_limiter("ollama/llama3") is not get_rate_limiter("ollama/qwen3")
+    assert get_rate_limiter("ollama/llama3") is get_rate_limiter("ollama/llama3")
+    assert get_rate_limiter("ollama/llama3").config.calls_per_minute > 90
+
+
+def test_configured_limits_apply_to_new_limiters(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_rate_limiters", {})
+    monkeypatch.setattr(rate_limit, "_rate_limits", dict(rate_limit.DEFAULT_RATE_LIMITS))
+
+    configure_rate_limits({"mistral": RateLimitConfig(calls_per_minute=30)})
+
+    assert get_rate_limiter("mistral/small").config.calls_per_minute == 30
+    assert get_rate_limiter("gemini/gemini-2.5-pro").config.calls_per_minute == 8